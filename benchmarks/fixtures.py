@@ -0,0 +1,161 @@
+"""
+Fixture deals and images for the benchmarks
+Everything is generated from fixed seeds so every run sees the same input
+"""
+
+import json
+import os
+from io import BytesIO
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+from lib.deals import parse_deals
+from lib.replay import BundleRecorder
+
+
+# Fictional brands, so PRODUCT_IMAGE_OVERRIDES never applies
+FIXTURE_BRANDS = ['Northwind', 'Halcyon', 'Brightline', 'Kestrel', 'Marlowe', 'Otterly', 'Quillon']
+FIXTURE_IMAGE_SIZE = (1600, 1600)
+
+
+def fixture_payload():
+    """
+    Deals API response for the fixture deals
+
+    Returns:
+        Dict shaped like the live API response
+    """
+    deals = []
+    for i, brand in enumerate(FIXTURE_BRANDS):
+        price = 40 + 15 * i
+        deals.append({
+            'brand': brand,
+            'name': f"{brand} fixture product",
+            'short_id': f"fx{i:04d}",
+            'current_price': price,
+            'best_promo_code': {'price_after_applied': round(price * (0.6 + 0.05 * i), 2)},
+            'image_urls': [f"https://fixtures.invalid/{brand.lower()}.jpg"],
+        })
+    return {'deals': deals}
+
+
+def fixture_deals():
+    """
+    Fixture deals as validated records
+
+    Returns:
+        List of Deal
+    """
+    return parse_deals(fixture_payload())
+
+
+def fixture_image(index, size=FIXTURE_IMAGE_SIZE):
+    """
+    Photo-like product shot: a noisy light backdrop with a shaded object
+
+    Args:
+        index: Fixture number (selects seed, color and shape)
+        size: Image size
+
+    Returns:
+        RGB PIL Image
+    """
+    rng = np.random.RandomState(1000 + index)
+    width, height = size
+
+    backdrop = rng.normal(235, 6, (height, width, 3)).clip(0, 255).astype(np.uint8)
+    image = Image.fromarray(backdrop)
+
+    draw = ImageDraw.Draw(image)
+    color = tuple(int(c) for c in rng.randint(30, 200, 3))
+    margin_x, margin_y = width // (4 + index % 3), height // (5 + index % 2)
+    box = (margin_x, margin_y, width - margin_x, height - margin_y)
+    if index % 2:
+        draw.rounded_rectangle(box, radius=width // 10, fill=color)
+    else:
+        draw.ellipse(box, fill=color)
+    draw.rectangle((box[0] + 60, box[1] + 80, box[2] - 60, box[1] + 140), fill=(250, 250, 250))
+
+    return image.filter(ImageFilter.GaussianBlur(1.5))
+
+
+def fixture_image_bytes(index):
+    """
+    Fixture image encoded as a JPEG, like a CDN response
+
+    Args:
+        index: Fixture number
+
+    Returns:
+        Bytes
+    """
+    buffer = BytesIO()
+    fixture_image(index).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def fixture_cutout(index):
+    """
+    Background-removed version of a fixture image, without running rembg
+
+    Args:
+        index: Fixture number
+
+    Returns:
+        RGBA PIL Image
+    """
+    image = fixture_image(index)
+    width, height = image.size
+    margin_x, margin_y = width // (4 + index % 3), height // (5 + index % 2)
+    mask = Image.new('L', image.size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle(
+        (margin_x, margin_y, width - margin_x, height - margin_y), radius=width // 10, fill=255
+    )
+    cutout = image.convert('RGBA')
+    cutout.putalpha(mask.filter(ImageFilter.GaussianBlur(2)))
+    return cutout
+
+
+def write_fixture_bundle(path):
+    """
+    Write the fixtures as a replay bundle (deals.json, images, manifest)
+
+    Args:
+        path: Bundle directory
+
+    Returns:
+        Bundle directory
+    """
+    if os.path.exists(os.path.join(path, 'manifest.json')):
+        return path
+
+    recorder = BundleRecorder(path)
+    payload = fixture_payload()
+    recorder.record_deals(json.dumps(payload).encode('utf-8'), 'https://fixtures.invalid/api/deals')
+    for i, deal in enumerate(payload['deals']):
+        recorder.record_image(deal['image_urls'][0], fixture_image_bytes(i))
+    recorder.save()
+    return path
+
+
+def fixture_pipeline(deals=None):
+    """
+    DailyPipeline preloaded with fixture images and cutouts, so renderers
+    run without downloads or background removal
+
+    Args:
+        deals: Optional deal list (fixture deals if None)
+
+    Returns:
+        DailyPipeline
+    """
+    from lib.pipeline import DailyPipeline
+
+    if deals is None:
+        deals = fixture_deals()
+    pipeline = DailyPipeline(deals=deals)
+    for i, deal in enumerate(deals):
+        url = deal.image_urls[0]
+        pipeline._store_url(url, fixture_image_bytes(i))
+        pipeline._assets[('url', url)]._cutout = fixture_cutout(i)
+    return pipeline
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Asset generator benchmarks
+Runs each stage against the fixture deals in a fresh process and reports
+wall time, CPU time, peak RSS and output bytes as JSON
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --stages slide,gif_encode --repeat 5
+    python benchmarks/run_benchmarks.py --compare results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+RESULT_PREFIX = 'BENCHMARK_RESULT '
+
+
+def _peak_rss_mb():
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return peak / 1024
+
+
+def run_stage_in_process(name):
+    """
+    Run one stage in this process and measure it
+
+    Args:
+        name: Stage name from STAGES
+
+    Returns:
+        Dict of metrics
+    """
+    from config import creative_config as config
+
+    # Measure the work itself, not the persistent caches
+    config.CACHE['cutouts']['enabled'] = False
+    config.CACHE['http']['enabled'] = False
+
+    from benchmarks.stages import STAGES, StageSkipped
+    setup, run, teardown = STAGES[name]
+
+    try:
+        state = setup()
+    except StageSkipped as e:
+        return {'status': 'skipped', 'reason': str(e)}
+
+    setup_rss = _peak_rss_mb()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        output_bytes = run(state)
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        if teardown is not None:
+            teardown(state)
+
+    return {
+        'status': 'ok',
+        'wall_s': wall,
+        'cpu_s': cpu,
+        'peak_rss_mb': _peak_rss_mb(),
+        'setup_rss_mb': setup_rss,
+        'output_bytes': output_bytes,
+    }
+
+
+def run_stage(name, verbose=False):
+    """
+    Run one stage in a fresh interpreter so peak RSS is per stage
+
+    Args:
+        name: Stage name
+        verbose: Echo the stage's own output
+
+    Returns:
+        Dict of metrics
+    """
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', name],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+    )
+    if verbose:
+        sys.stdout.write(completed.stdout)
+        sys.stderr.write(completed.stderr)
+
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+
+    error = (completed.stderr.strip().splitlines() or ['no output'])[-1]
+    return {'status': 'error', 'reason': error}
+
+
+def summarize(runs):
+    """
+    Combine repeated runs of a stage
+
+    Args:
+        runs: List of metric dicts from run_stage()
+
+    Returns:
+        Dict with median wall/CPU time, best wall time and peak RSS
+    """
+    ok = [r for r in runs if r['status'] == 'ok']
+    if not ok:
+        return runs[0]
+    return {
+        'status': 'ok',
+        'wall_s': statistics.median(r['wall_s'] for r in ok),
+        'wall_min_s': min(r['wall_s'] for r in ok),
+        'cpu_s': statistics.median(r['cpu_s'] for r in ok),
+        'peak_rss_mb': max(r['peak_rss_mb'] for r in ok),
+        'setup_rss_mb': max(r['setup_rss_mb'] for r in ok),
+        'output_bytes': ok[-1]['output_bytes'],
+        'runs': len(ok),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Print a comparison against a baseline results file
+
+    Args:
+        results: Current results dict
+        baseline: Baseline results dict
+        threshold: Relative slowdown treated as a regression (0.1 = 10%)
+
+    Returns:
+        List of regressed stage names
+    """
+    regressions = []
+    print(f"\n{'stage':<16} {'base wall':>10} {'wall':>10} {'change':>8} {'base rss':>9} {'rss':>9}")
+    for name, current in results['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if not base or base.get('status') != 'ok' or current.get('status') != 'ok':
+            print(f"{name:<16} {'-':>10} {current.get('status'):>10}")
+            continue
+
+        change = current['wall_s'] / base['wall_s'] - 1 if base['wall_s'] else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<16} {base['wall_s']:>9.3f}s {current['wall_s']:>9.3f}s {change:>+7.0%} "
+              f"{base['peak_rss_mb']:>7.0f}MB {current['peak_rss_mb']:>7.0f}MB{flag}")
+    return regressions
+
+
+def main(argv=None):
+    from benchmarks.stages import STAGES
+
+    parser = argparse.ArgumentParser(description="Benchmark the asset generator stages")
+    parser.add_argument('--stages', help=f"Comma-separated stages (default: all of {', '.join(STAGES)})")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per stage (default 3)")
+    parser.add_argument('--output', help="Write results JSON to this file")
+    parser.add_argument('--compare', metavar='BASELINE', help="Compare against a previous results JSON")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Slowdown reported as a regression with --compare (default 0.10)")
+    parser.add_argument('--verbose', action='store_true', help="Show each stage's own output")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(RESULT_PREFIX + json.dumps(run_stage_in_process(args.child)))
+        return 0
+
+    names = args.stages.split(',') if args.stages else list(STAGES)
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)}")
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'repeat': args.repeat,
+        'stages': {},
+    }
+    for name in names:
+        runs = [run_stage(name, args.verbose) for _ in range(max(1, args.repeat))]
+        summary = summarize(runs)
+        results['stages'][name] = summary
+        if summary['status'] == 'ok':
+            print(f"{name:<16} wall {summary['wall_s']:7.3f}s  cpu {summary['cpu_s']:7.3f}s  "
+                  f"peak rss {summary['peak_rss_mb']:6.0f} MB  output {summary['output_bytes'] / 1024:9.0f} KB")
+        else:
+            print(f"{name:<16} {summary['status']}: {summary.get('reason', '')}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Benchmark stages
+Each stage has a setup step (not timed) and a run step (timed) that
+returns the number of output bytes it produced
+"""
+
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from config import creative_config as config
+from benchmarks import fixtures
+
+
+IMAGE_WIDTH = 1080
+IMAGE_HEIGHT = 1920
+
+
+class StageSkipped(Exception):
+    """Raised by a setup step when the stage cannot run here"""
+
+
+def _raw_bytes(image):
+    return image.width * image.height * len(image.getbands())
+
+
+def _fonts():
+    from lib.font_registry import get_font_registry
+    registry = get_font_registry()
+    return registry.resolve('medium'), registry.resolve('light')
+
+
+# Gradient backgrounds, rendered cold for every color scheme
+
+def setup_gradient():
+    from lib import image_utils
+    image_utils._gradient_cache.clear()
+    return list(config.COLOR_SCHEMES)
+
+
+def run_gradient(schemes):
+    from lib.image_utils import create_gradient_background
+    return sum(_raw_bytes(create_gradient_background(IMAGE_WIDTH, IMAGE_HEIGHT, scheme))
+               for scheme in schemes)
+
+
+# Font loading and text layout for every slide's brand and discount line
+
+def setup_text():
+    from lib import font_registry, text_utils
+    from PIL import Image
+    font_registry._font_registry = None
+    text_utils._layout_cache.clear()
+    canvas = Image.new('RGB', (IMAGE_WIDTH, 400), 'white')
+    return fixtures.fixture_deals(), canvas
+
+
+def run_text(state):
+    from PIL import ImageDraw
+    from lib.text_utils import measure_text, draw_text_layout
+    deals, canvas = state
+    font_medium, font_light = _fonts()
+    draw = ImageDraw.Draw(canvas)
+    for deal in deals:
+        brand = measure_text(deal.brand.lower(), font_medium, 70)
+        discount = measure_text(f"{deal.discount_percent}% off sitewide", font_light, 55)
+        draw_text_layout(draw, brand, (IMAGE_WIDTH // 2, 100), fill='black', align='center')
+        draw_text_layout(draw, discount, (IMAGE_WIDTH // 2, 200), fill='#666666', align='center')
+    return _raw_bytes(canvas)
+
+
+# Parallel image download from a local HTTP stand-in serving the fixtures
+
+def setup_download():
+    from lib import replay
+    from lib.downloader import Downloader
+    bundle_dir = tempfile.mkdtemp(prefix='bench-bundle-')
+    fixtures.write_fixture_bundle(bundle_dir)
+    replay.start_replay(bundle_dir, serve=True)
+    urls = [deal.image_urls[0] for deal in fixtures.fixture_deals()]
+    return Downloader(cache=None), urls, bundle_dir
+
+
+def run_download(state):
+    downloader, urls, _ = state
+    bodies = downloader.fetch_all(urls)
+    return sum(len(body) for body in bodies.values() if body)
+
+
+def teardown_download(state):
+    from lib import replay
+    replay.stop()
+    shutil.rmtree(state[2], ignore_errors=True)
+
+
+# Background removal, batched, with the model already loaded
+
+def setup_rembg():
+    try:
+        from lib.background_removal import BackgroundRemover
+    except ImportError as e:
+        raise StageSkipped(f"rembg unavailable: {e}")
+    remover = BackgroundRemover()
+    try:
+        remover.session
+    except Exception as e:
+        raise StageSkipped(f"model unavailable: {e}")
+    images = [fixtures.fixture_image(i) for i in range(len(fixtures.FIXTURE_BRANDS))]
+    return remover, images
+
+
+def run_rembg(state):
+    remover, images = state
+    return sum(_raw_bytes(cutout) for cutout in remover.remove_batch(images))
+
+
+# Collage composition of five cutouts on the cover page
+
+def setup_collage():
+    from lib.image_utils import create_gradient_background
+    cutouts = [fixtures.fixture_cutout(i) for i in range(5)]
+    return create_gradient_background(IMAGE_WIDTH, IMAGE_HEIGHT), cutouts
+
+
+def run_collage(state):
+    from lib.collage import arrange_products_collage
+    background, cutouts = state
+    canvas = background.copy()
+    arrange_products_collage(canvas, cutouts, 520, IMAGE_HEIGHT - 570)
+    return _raw_bytes(canvas)
+
+
+# Composition of every individual product slide
+
+def setup_slide():
+    deals = fixtures.fixture_deals()
+    cutouts = [fixtures.fixture_cutout(i) for i in range(len(deals))]
+    return deals, cutouts
+
+
+def run_slide(state):
+    import generate_tiktok_images
+    deals, cutouts = state
+    font_medium, font_light = _fonts()
+    total = 0
+    for deal, cutout in zip(deals, cutouts):
+        image = generate_tiktok_images.compose_tiktok_image(deal, cutout, font_medium, font_light)
+        total += _raw_bytes(image)
+    return total
+
+
+# Animated cover: static layer plus every frame
+
+def setup_animated_frames():
+    pipeline = fixtures.fixture_pipeline()
+    return pipeline
+
+
+def run_animated_frames(pipeline):
+    import generate_animated_cover
+    font_medium, _ = _fonts()
+    scene = generate_animated_cover.build_animated_cover_scene(pipeline.deals, font_medium, pipeline)
+    return sum(_raw_bytes(frame) for _, frame, _ in scene.iter_frames())
+
+
+# GIF encoding of pre-rendered frames
+
+def setup_gif_encode():
+    import generate_animated_cover
+    pipeline = fixtures.fixture_pipeline()
+    font_medium, _ = _fonts()
+    scene = generate_animated_cover.build_animated_cover_scene(pipeline.deals, font_medium, pipeline)
+    frames = list(scene.iter_frames())
+    fd, path = tempfile.mkstemp(suffix='.gif')
+    os.close(fd)
+    return scene, frames, path
+
+
+def run_gif_encode(state):
+    from lib.gif_encoder import build_global_palette, GifWriter
+    scene, frames, path = state
+    palette = build_global_palette(scene.palette_sources())
+    with GifWriter(path, palette, duration=config.ANIMATION['frame_duration']) as writer:
+        for _, frame, dirty_rects in frames:
+            writer.add_frame(frame, dirty_rects)
+    return os.path.getsize(path)
+
+
+def teardown_gif_encode(state):
+    os.remove(state[2])
+
+
+# PNG encoding of every composed slide
+
+def setup_png_save():
+    import generate_tiktok_images
+    deals, cutouts = setup_slide()
+    font_medium, font_light = _fonts()
+    return [generate_tiktok_images.compose_tiktok_image(deal, cutout, font_medium, font_light)
+            for deal, cutout in zip(deals, cutouts)]
+
+
+def run_png_save(images):
+    total = 0
+    for image in images:
+        buffer = BytesIO()
+        image.save(buffer, 'PNG')
+        total += buffer.tell()
+    return total
+
+
+# Encoding of every composed slide in the configured output format and options
+
+def run_encode(images):
+    from lib.output_encoder import encode_image
+    from lib.output_formats import output_format
+    fmt = output_format('individual')
+    return sum(len(encode_image(image, fmt)) for image in images)
+
+
+# name: (setup, run, teardown), in pipeline order
+STAGES = {
+    'gradient': (setup_gradient, run_gradient, None),
+    'text': (setup_text, run_text, None),
+    'download': (setup_download, run_download, teardown_download),
+    'rembg': (setup_rembg, run_rembg, None),
+    'collage': (setup_collage, run_collage, None),
+    'slide': (setup_slide, run_slide, None),
+    'animated_frames': (setup_animated_frames, run_animated_frames, None),
+    'gif_encode': (setup_gif_encode, run_gif_encode, teardown_gif_encode),
+    'png_save': (setup_png_save, run_png_save, None),
+    'encode': (setup_png_save, run_encode, None),
+}
@@ -48,7 +48,45 @@ FONTS = {
     }
 }
 
+# Font Candidates by weight - first existing path wins (SF Pro Rounded on macOS)
+FONT_CANDIDATES = {
+    'medium': [
+        "/System/Library/Fonts/SFProRounded-Medium.ttf",
+        "/System/Library/Fonts/Supplemental/SF-Pro-Rounded-Medium.otf",
+        "/Library/Fonts/SF-Pro-Rounded-Medium.otf",
+        "/System/Library/Fonts/SF-Pro-Medium.ttf",
+    ],
+    'light': [
+        "/System/Library/Fonts/SFProRounded-Light.ttf",
+        "/System/Library/Fonts/Supplemental/SF-Pro-Rounded-Light.otf",
+        "/Library/Fonts/SF-Pro-Rounded-Light.otf",
+        "/System/Library/Fonts/SF-Pro-Light.ttf",
+    ],
+    'regular': [
+        "/System/Library/Fonts/SFProRounded.ttf",
+        "/System/Library/Fonts/Supplemental/SF-Pro-Rounded-Regular.otf",
+        "/Library/Fonts/SF-Pro-Rounded-Regular.otf",
+        "/System/Library/Fonts/SF-Pro.ttf",
+    ],
+}
+
+# Paths the collage pages (cover, animated cover, end page) check before FONT_CANDIDATES
+COLLAGE_FONT_CANDIDATES = {
+    'medium': ["/Library/Fonts/SF-Pro-Rounded-Medium.otf"],
+}
+
+# Fallbacks tried in order when a weight has no candidate on disk: a weight
+# name tries that weight's FONT_CANDIDATES, anything else is a bundled font
+# (Lato, SIL OFL, for Linux renderers without SF Pro) relative to the project root
+FONT_FALLBACKS = {
+    'medium': ['regular', 'fonts/Lato-Regular.ttf'],
+    'light': ['regular', 'fonts/Lato-Light.ttf'],
+    'regular': ['fonts/Lato-Regular.ttf'],
+}
+
 # Color Schemes - Easy to swap!
+# Optional keys: 'gradient_direction' ('vertical', 'horizontal', 'diagonal')
+# and 'gradient_stops' [(position 0.0-1.0, (r, g, b)), ...] for multi-stop gradients
 COLOR_SCHEMES = {
     'blue_pink': {
         'gradient_start': (190, 227, 248),  # Light blue
@@ -74,6 +112,20 @@ COLOR_SCHEMES = {
         'text_shadow': (100, 100, 100, 200),
         'container_bg': 'white',
     },
+    'aurora': {
+        'gradient_start': (190, 227, 248),  # Light blue
+        'gradient_end': (255, 218, 185),    # Peach
+        'gradient_direction': 'diagonal',
+        'gradient_stops': [
+            (0.0, (190, 227, 248)),  # Light blue
+            (0.5, (239, 198, 237)),  # Light pink
+            (1.0, (255, 218, 185)),  # Peach
+        ],
+        'text_primary': 'white',
+        'text_secondary': '#555555',
+        'text_shadow': (160, 160, 160, 200),
+        'container_bg': 'white',
+    },
 }
 
 # Active color scheme - change this to experiment!
@@ -136,6 +188,35 @@ PRODUCT_POSITIONS = {
 # Active product positioning style
 ACTIVE_PRODUCT_POSITION = 'clustered'
 
+# Product Image Overrides
+# Higher-quality sources for specific brands on the collage pages (cover/end)
+# 'url' replaces the API image, 'path' loads a local file instead
+PRODUCT_IMAGE_OVERRIDES = {
+    'Vuori': {
+        'url': 'https://cdn.shopify.com/s/files/1/0022/4008/6074/products/V8003STY_539d9e62-f5d3-4524-ba57-0301aeafb764.jpg?v=1754073098',
+    },
+    'Mejuri': {
+        'path': 'generated_images/2025-10-27/mejuri_earings.png',
+        'remove_background': True,
+    },
+    'Byredo': {
+        'path': 'generated_images/2025-10-28/byredo.png',
+        'remove_background': False,  # Already has proper background
+    },
+    'Garrett Leight': {
+        'path': 'generated_images/2025-10-28/garretlight.png',
+        'remove_background': False,
+    },
+    'Skullcandy': {
+        'path': 'generated_images/2025-10-29/skullcandy.webp',
+        'remove_background': False,
+    },
+    'Gap': {
+        'path': 'generated_images/2025-10-29/gap.avif',
+        'remove_background': False,
+    },
+}
+
 # Icon Positions
 ICON_POSITIONS = {
     'default': [
@@ -182,6 +263,9 @@ ANIMATION = {
     'frames': 30,
     'frame_duration': 100,  # milliseconds
     'loop': True,
+    'prefetch_frames': 2,   # Frames rendered ahead of the encoder on a background thread
+    'preview_frames': 6,    # Frames sampled into a preview contact sheet, 0 = no preview
+    'preview_dir': 'previews',  # Under CACHE['base_dir'], one folder per day
 }
 
 # Output Settings
@@ -190,18 +274,140 @@ OUTPUT = {
     'date_format': '%Y-%m-%d',
     'include_timestamp': False,
     'formats': {
-        'individual': 'png',
+        'individual': 'png',      # 'png', 'webp', 'avif' or 'jpeg' (progressive)
         'cover': 'png',
-        'cover_animated': 'gif',
+        'cover_animated': 'gif',  # 'gif', 'mp4' (H.264) or 'webm' (VP9)
         'end': 'png',
     }
 }
 
+# Encoding Settings - Options per still image format in OUTPUT['formats']
+ENCODING = {
+    'workers': 0,  # Threads encoding slides while the next one is composed, 0 = one per CPU core
+    'png': {
+        'compress_level': 6,  # zlib level 0-9, higher is smaller and slower
+        'optimize': False,    # Extra compression pass (implies level 9)
+        'quantize': False,    # Reduce to a palette (much smaller, lossy for gradients)
+        'colors': 256,
+        'dither': True,
+    },
+    'webp': {
+        'quality': 90,
+        'method': 4,          # 0 (fast) to 6 (smallest)
+        'lossless': False,
+    },
+    'avif': {
+        'quality': 75,
+        'speed': 6,           # 0 (slowest, smallest) to 10
+    },
+    'jpeg': {
+        'quality': 90,
+        'progressive': True,
+        'optimize': True,
+        'subsampling': '4:2:0',
+    },
+}
+
+# Video Settings - Encoder options when the animated cover is saved as video
+VIDEO = {
+    'ffmpeg_path': 'ffmpeg',  # Falls back to PyAV if ffmpeg is not on PATH
+    'mp4': {
+        'codec': 'libx264',
+        'crf': 20,             # Lower is higher quality, 18-23 is visually lossless-ish
+        'preset': 'medium',
+    },
+    'webm': {
+        'codec': 'libvpx-vp9',
+        'crf': 32,
+    },
+}
+
+# Background Removal - rembg model and ONNX Runtime session options
+BACKGROUND_REMOVAL = {
+    'model': 'u2net',          # 'u2net', 'u2netp' (fast, small), 'isnet-general-use' (detailed)
+    'intra_op_threads': 0,     # Threads inside one operator, 0 = ONNX Runtime default
+    'inter_op_threads': 0,     # Threads across independent operators, 0 = default
+    'providers': ['CPUExecutionProvider'],
+    'batch_size': 8,           # Images per ONNX inference call in batch mode
+    'max_source_edge': 1280,   # Longest source edge kept for removal and compositing, 0 = full resolution
+    'restore_full_resolution': False,  # Upscale the mask onto the full-size source for high-detail output
+}
+
+# Optimization Settings - Used when FEATURES['auto_optimize_images'] is on
+OPTIMIZATION = {
+    'min_ssim': 0.99,   # Lowest structural similarity to the rendered page accepted (1.0 = identical)
+    'quality_steps': [90, 85, 80, 75, 70, 60, 50],  # WebP/AVIF/JPEG qualities tried below ENCODING's
+    'palette_colors': [256, 128, 64],  # PNG palette sizes tried
+}
+
+# Rendering Settings
+RENDERING = {
+    'workers': 0,  # Processes rendering individual slides, 0 = one per CPU core, 1 = serial
+}
+
+# Build Settings - Incremental rebuilds within a day's output folder
+BUILD = {
+    'incremental': True,                # Keep outputs whose inputs are unchanged, False = always re-render
+    'dir': 'builds',                    # Manifests of input fingerprints, one per day folder, under CACHE['base_dir']
+}
+
+# Cache Settings - Persistent on-disk caches shared between daily runs
+CACHE = {
+    'base_dir': '.cache',
+    'cutouts': {
+        'enabled': True,
+        'dir': 'cutouts',
+        'max_size_mb': 512,  # Least recently used cutouts are evicted above this
+        'format': 'png',     # 'png' or 'webp' (stored lossless)
+    },
+    'http': {
+        'enabled': True,
+        'dir': 'http',
+        'max_size_mb': 1024,  # Revalidated with ETag / Last-Modified
+    },
+    'sprites': {
+        'enabled': True,
+        'dir': 'sprites',
+        'max_size_mb': 64,    # Resized logo, sparkle and icon sprites keyed by source hash
+    },
+    'deals': {
+        'dir': 'deals',       # Raw API response, one <day>.json per day (--refresh-deals fetches again)
+    },
+    'renders': {
+        'enabled': True,
+        'dir': 'renders',
+        'max_size_mb': 1024,  # Finished slides keyed by input fingerprint, reused across days
+        'hardlink': True,     # Hardlink reused slides into the day folder (copies if unsupported)
+    },
+}
+
+# Tracing Settings - Per-stage timings of each generate_all_images.py run
+TRACING = {
+    'enabled': True,
+    'dir': 'traces',  # Under CACHE['base_dir'], one folder per day (Chrome trace JSON)
+}
+
+# Profiling Settings - Used with --profile or GENERATOR_PROFILE=1
+PROFILING = {
+    'dir': 'profiles',        # Under CACHE['base_dir'], one folder per day (.prof stats + .txt summary)
+    'top': 30,                # Rows per table in the summary
+    'tracemalloc_frames': 1,  # Stack depth recorded per allocation (deeper is slower)
+}
+
+# Download Settings - Product image fetching
+DOWNLOADS = {
+    'max_workers': 8,            # Parallel downloads
+    'per_host_connections': 4,   # Pooled connections per CDN host
+    'retries': 3,
+    'backoff_factor': 0.5,       # Sleep 0.5s, 1s, 2s... between retries
+    'timeout': 10,               # Seconds
+}
+
 # Feature Flags - Turn features on/off easily
 FEATURES = {
     'background_removal': True,
     'text_shadows': True,
-    'auto_optimize_images': False,
+    'auto_optimize_images': False,  # Smallest encoding within OPTIMIZATION['min_ssim'] of the render
     'generate_thumbnails': False,
     'watermark': False,
 }
@@ -4,29 +4,93 @@ Master TikTok Image Generator
 Generates individual product images, cover page, and end page
 """
 
+import argparse
 import os
-import sys
 from datetime import datetime
 
+from config import creative_config as config
+
 # Import the individual generators
 import generate_tiktok_images
 import generate_cover_page
 import generate_end_page
+from lib import replay, instrumentation, profiling
+from lib.instrumentation import span
+from lib.pipeline import DailyPipeline
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Generate all TikTok assets for today")
+    parser.add_argument('--record', metavar='BUNDLE',
+                        help="Record the deals response and every downloaded image into a replay bundle")
+    parser.add_argument('--replay', metavar='BUNDLE',
+                        help="Run offline from a recorded bundle instead of the live API and CDNs")
+    parser.add_argument('--serve', action='store_true',
+                        help="With --replay, serve the bundle from a local HTTP server instead of reading it directly")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile the run with cProfile and tracemalloc (or set GENERATOR_PROFILE=1)")
+    parser.add_argument('--refresh-deals', action='store_true',
+                        help="Fetch the deals from the API even if today's snapshot exists")
+    args = parser.parse_args(argv)
+    if args.record and args.replay:
+        parser.error("--record and --replay cannot be combined")
+    if args.serve and not args.replay:
+        parser.error("--serve needs --replay")
+    return args
+
+
+def main(argv=None):
+    """Generate all TikTok assets for today, optionally recording or replaying a bundle"""
+    args = parse_args(argv)
+
+    if args.replay:
+        replay.start_replay(args.replay, serve=args.serve)
+    if args.record:
+        replay.start_recording(args.record)
 
+    try:
+        if profiling.profiling_requested(args.profile):
+            profiling.run_profiled(generate_all, 'generate_all_images', refresh_deals=args.refresh_deals)
+        else:
+            generate_all(refresh_deals=args.refresh_deals)
+    finally:
+        replay.stop()
+        # Per-stage timings, so a slow run can be diagnosed without a rerun
+        instrumentation.write_trace()
+
+
+def generate_all(refresh_deals=False):
+    """
+    Generate all TikTok assets for today
 
-def main():
-    """Generate all TikTok assets for today"""
+    Args:
+        refresh_deals: Fetch the deals again instead of reading today's snapshot
+    """
     print("=" * 60)
     print("TikTok Daily Image Generator")
     print("Generating all assets for today's deals")
     print("=" * 60)
     print()
 
+    # Fetch deals and download product images once for every generator;
+    # each generator then cuts out only what it has to re-render
+    with span('step', 'load deals'):
+        pipeline = DailyPipeline(refresh_deals=refresh_deals)
+    if not pipeline.deals:
+        print("No deals found. Exiting.")
+        return
+    with span('step', 'download product images'):
+        pipeline.download_all()
+
+    print()
+
     # Generate individual product images
     print("STEP 1: Generating individual product images...")
     print("-" * 60)
     try:
-        generate_tiktok_images.main()
+        with span('step', 'product images'):
+            generate_tiktok_images.main(pipeline)
     except Exception as e:
         print(f"Error generating product images: {e}")
         import traceback
@@ -39,7 +103,8 @@ def main():
     print("STEP 2: Generating cover page...")
     print("-" * 60)
     try:
-        generate_cover_page.main()
+        with span('step', 'cover page'):
+            generate_cover_page.main(pipeline)
     except Exception as e:
         print(f"Error generating cover page: {e}")
         import traceback
@@ -52,7 +117,8 @@ def main():
     print("STEP 3: Generating end page...")
     print("-" * 60)
     try:
-        generate_end_page.main()
+        with span('step', 'end page'):
+            generate_end_page.main(pipeline)
     except Exception as e:
         print(f"Error generating end page: {e}")
         import traceback
@@ -63,7 +129,7 @@ def main():
     print("All images generated successfully!")
 
     today = datetime.now().strftime("%Y-%m-%d")
-    output_dir = os.path.join("generated_images", today)
+    output_dir = os.path.join(config.OUTPUT['base_dir'], today)
     print(f"Check your images at: {output_dir}")
     print("=" * 60)
 
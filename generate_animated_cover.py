@@ -1,26 +1,36 @@
 #!/usr/bin/env python3
 """
 TikTok Animated Cover Page Generator
-Creates an animated GIF cover page with floating icons
+Creates an animated cover page (GIF, MP4 or WebM) with floating icons
 """
 
 import os
-import requests
+import time
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
-from io import BytesIO
-from rembg import remove
+from PIL import ImageDraw
 import math
 
+from config import creative_config as config
+from lib.font_registry import get_font_registry
+from lib.text_utils import measure_text, draw_text_layout
+from lib.image_utils import create_gradient_background
+from lib.assets import get_asset_manager
+from lib.collage import arrange_products_collage
+from lib.gif_encoder import build_global_palette, GifWriter
+from lib.video_writer import VIDEO_FORMATS, VideoWriter, video_encoder_available
+from lib.frame_stream import prefetch, FrameSampler
+from lib.pipeline import DailyPipeline
+from lib.profiling import run_main
+from lib.instrumentation import span, count
+from lib.build_manifest import BuildManifest, fingerprint
+
 
 # Configuration
-API_URL = "https://item-api-rosy.vercel.app/api/deals"
 LOGO_PATH = "DecoyWizard.png"
-OUTPUT_BASE_DIR = "generated_images"
 IMAGE_WIDTH = 1080
 IMAGE_HEIGHT = 1920
-NUM_FRAMES = 30  # Number of frames in the animation
-FRAME_DURATION = 100  # Duration of each frame in milliseconds
+NUM_FRAMES = config.ANIMATION['frames']  # Number of frames in the animation
+FRAME_DURATION = config.ANIMATION['frame_duration']  # Duration of each frame in milliseconds
 
 # Asset paths
 SPARKLE_EMOJI_PATH = "sparkle-emoji.png"
@@ -29,100 +39,19 @@ CREDIT_CARD_PATH = "CreditCard.png"
 GIFT_PATH = "Gift.png"
 DISCOUNT_SIGN_PATH = "discountsign.png"
 
-# Font paths
-FONT_PATHS_MEDIUM = [
-    "/Library/Fonts/SF-Pro-Rounded-Medium.otf",
-    "/System/Library/Fonts/SFProRounded-Medium.ttf",
-    "/System/Library/Fonts/Supplemental/SF-Pro-Rounded-Medium.otf",
-    "/System/Library/Fonts/SF-Pro-Medium.ttf",
-]
-
 
 def get_font_path(weight='medium'):
-    """Find available SF Pro Rounded font with specified weight"""
-    paths = FONT_PATHS_MEDIUM
-
-    for path in paths:
-        if os.path.exists(path):
-            return path
-
-    print("Warning: SF Pro Rounded Medium not found, using default font")
-    return None
-
-
-def create_gradient_background(width, height):
-    """Create a gradient background from light blue to pink"""
-    img = Image.new('RGB', (width, height), '#FFFFFF')
-    draw = ImageDraw.Draw(img)
-
-    # Define colors (light blue to pink)
-    color_start = (190, 227, 248)  # Light blue
-    color_end = (239, 198, 237)    # Light pink
+    """Find available SF Pro Rounded font with specified weight (bundled fallback on Linux)"""
+    return get_font_registry().resolve(weight, config.COLLAGE_FONT_CANDIDATES.get(weight))
 
-    # Create vertical gradient
-    for y in range(height):
-        ratio = y / height
-        r = int(color_start[0] + (color_end[0] - color_start[0]) * ratio)
-        g = int(color_start[1] + (color_end[1] - color_start[1]) * ratio)
-        b = int(color_start[2] + (color_end[2] - color_start[2]) * ratio)
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
 
-    return img
-
-
-def fetch_deals():
-    """Fetch deals from API"""
-    print("Fetching deals from API...")
+def add_text_with_shadow(draw, layout, position, fill='white', shadow_offset=5):
+    """Add measured text with shadow effect"""
     try:
-        response = requests.get(API_URL)
-        response.raise_for_status()
-        data = response.json()
-        return data.get('deals', [])
-    except Exception as e:
-        print(f"Error fetching deals: {e}")
-        return []
-
-
-def download_image(url):
-    """Download image from URL"""
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return Image.open(BytesIO(response.content))
-    except Exception as e:
-        print(f"Error downloading image from {url}: {e}")
-        return None
-
-
-def remove_background(image):
-    """Remove background from image using rembg"""
-    try:
-        img_byte_arr = BytesIO()
-        image.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
-        output = remove(img_byte_arr.read())
-        return Image.open(BytesIO(output))
-    except Exception as e:
-        print(f"  Error removing background: {e}")
-        return image
-
-
-def add_text_with_shadow(draw, text, position, font_size, font_path, fill='white', shadow_offset=5):
-    """Add text with shadow effect"""
-    try:
-        if font_path:
-            font = ImageFont.truetype(font_path, font_size)
-        else:
-            font = ImageFont.load_default()
-
-        x, y = position
-
-        # Draw shadow (slightly offset, darker)
-        shadow_color = (180, 180, 180, 200)  # Light gray shadow
-        draw.text((x + shadow_offset, y + shadow_offset), text, font=font, fill=shadow_color)
-
-        # Draw main text
-        draw.text((x, y), text, font=font, fill=fill)
+        # Light gray shadow, slightly offset
+        shadow_color = (180, 180, 180, 200)
+        draw_text_layout(draw, layout, position, fill,
+                         shadow_offset=shadow_offset, shadow_fill=shadow_color)
 
     except Exception as e:
         print(f"  Error adding text: {e}")
@@ -140,28 +69,25 @@ def calculate_floating_position(base_x, base_y, frame, total_frames, movement_ra
     return int(base_x + offset_x), int(base_y + offset_y)
 
 
-def create_frame(frame_num, total_frames, base_canvas, logo, sparkle, product_images,
-                 font_path, title_x, title_y, text_width, content_start_y, content_height,
-                 icon_data):
-    """Create a single frame of the animation"""
-    # Create a copy of the base canvas
+def build_static_layer(base_canvas, logo, sparkle, product_images, title_layout, title_x, title_y,
+                       text_width, content_start_y, content_height):
+    """Render everything that does not move (logo, title, sparkles, products) once"""
     canvas = base_canvas.copy()
 
-    # Paste logo (static)
-    logo_x = (IMAGE_WIDTH - logo.width) // 2
-    logo_y = 60
-    if logo.mode == 'RGBA':
-        canvas.paste(logo, (logo_x, logo_y), logo)
-    else:
-        canvas.paste(logo, (logo_x, logo_y))
+    # Paste logo
+    if logo:
+        logo_x = (IMAGE_WIDTH - logo.width) // 2
+        logo_y = 60
+        if logo.mode == 'RGBA':
+            canvas.paste(logo, (logo_x, logo_y), logo)
+        else:
+            canvas.paste(logo, (logo_x, logo_y))
 
     # Add text with shadow
     draw = ImageDraw.Draw(canvas, 'RGBA')
-    title_text = "decoy daily deals"
-    title_font_size = 80
-    add_text_with_shadow(draw, title_text, (title_x, title_y), title_font_size, font_path, fill='white', shadow_offset=5)
+    add_text_with_shadow(draw, title_layout, (title_x, title_y), fill='white', shadow_offset=5)
 
-    # Add sparkles (static)
+    # Add sparkles
     if sparkle:
         sparkle_y = title_y + 10
         left_sparkle_x = title_x - sparkle.width - 20
@@ -174,72 +100,124 @@ def create_frame(frame_num, total_frames, base_canvas, logo, sparkle, product_im
             canvas.paste(sparkle, (left_sparkle_x, sparkle_y))
             canvas.paste(sparkle, (right_sparkle_x, sparkle_y))
 
-    # Arrange products (static)
+    # Arrange products
     arrange_products_collage(canvas, product_images, content_start_y, content_height)
 
-    # Add decorative icons with floating animation
-    add_animated_icons(canvas, frame_num, total_frames, icon_data)
-
     return canvas
 
 
-def arrange_products_collage(canvas, product_images, start_y, available_height):
-    """Arrange products in a clustered collage style with slight overlap"""
-    content_width = IMAGE_WIDTH - 200
-    content_x_offset = 100
-
-    positions = [
-        (0.25, 0.20, 0.38, -18),
-        (0.60, 0.18, 0.42, 15),
-        (0.30, 0.48, 0.36, -10),
-        (0.68, 0.52, 0.39, 20),
-        (0.48, 0.75, 0.41, -12),
-    ]
-
-    for i, product_img in enumerate(product_images):
-        if i >= len(positions):
-            break
-
-        x_ratio, y_ratio, size_ratio, rotation = positions[i]
-        max_size = int(available_height * size_ratio)
-
-        aspect_ratio = product_img.width / product_img.height
-        if aspect_ratio > 1:
-            new_width = max_size
-            new_height = int(max_size / aspect_ratio)
-        else:
-            new_height = max_size
-            new_width = int(max_size * aspect_ratio)
-
-        product_img_resized = product_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        product_img_rotated = product_img_resized.rotate(rotation, expand=True, resample=Image.Resampling.BICUBIC)
-
-        x = content_x_offset + int(content_width * x_ratio)
-        y = int(start_y + available_height * y_ratio)
-
-        x -= product_img_rotated.width // 2
-        y -= product_img_rotated.height // 2
-
-        if product_img_rotated.mode == 'RGBA':
-            canvas.paste(product_img_rotated, (x, y), product_img_rotated)
-        else:
-            canvas.paste(product_img_rotated, (x, y))
-
-
-def add_animated_icons(canvas, frame_num, total_frames, icon_data):
-    """Add decorative icons with floating animation"""
-    for icon, base_x, base_y, movement_range in icon_data:
-        # Calculate floating position
-        x, y = calculate_floating_position(base_x, base_y, frame_num, total_frames, movement_range)
-
-        if icon.mode == 'RGBA':
-            canvas.paste(icon, (x, y), icon)
-        else:
-            canvas.paste(icon, (x, y))
+class AnimatedCoverScene:
+    """
+    The animated cover split into a static layer, rendered once, and the
+    floating icon sprites that are the only thing composited per frame
+    """
+
+    def __init__(self, static_layer, icon_data, total_frames):
+        self.static_layer = static_layer
+        self.total_frames = total_frames
+
+        # (sprite, paste mask, width, height) per icon; positions for every frame up front
+        self.sprites = []
+        self.positions = [[] for _ in range(total_frames)]
+        for icon, base_x, base_y, movement_range in icon_data:
+            mask = icon if icon.mode == 'RGBA' else None
+            self.sprites.append((icon, mask, icon.width, icon.height))
+            for frame_num in range(total_frames):
+                self.positions[frame_num].append(
+                    calculate_floating_position(base_x, base_y, frame_num, total_frames, movement_range)
+                )
+
+    @property
+    def size(self):
+        return self.static_layer.size
+
+    def icon_boxes(self, frame_num):
+        """
+        Bounding boxes of the icons in a frame, clipped to the canvas
+
+        Args:
+            frame_num: Frame index
+
+        Returns:
+            List of (left, top, right, bottom) tuples, one per icon
+        """
+        width, height = self.size
+        boxes = []
+        for (_, _, icon_w, icon_h), (x, y) in zip(self.sprites, self.positions[frame_num]):
+            boxes.append((max(x, 0), max(y, 0), min(x + icon_w, width), min(y + icon_h, height)))
+        return boxes
+
+    def dirty_rects(self, frame_num):
+        """
+        Regions that can differ from the previous frame
+
+        The first frame is entirely dirty; after that only the union of each
+        icon's previous and current box changes.
+
+        Args:
+            frame_num: Frame index
+
+        Returns:
+            List of (left, top, right, bottom) tuples
+        """
+        if frame_num == 0:
+            return [(0, 0) + self.size]
+
+        rects = []
+        for prev, cur in zip(self.icon_boxes(frame_num - 1), self.icon_boxes(frame_num)):
+            if prev == cur:
+                continue
+            rects.append((min(prev[0], cur[0]), min(prev[1], cur[1]),
+                          max(prev[2], cur[2]), max(prev[3], cur[3])))
+        return rects
+
+    def palette_sources(self):
+        """
+        Images covering every color the animation can show: the static
+        layer and each icon composited over the area it floats in
+
+        Returns:
+            List of RGB PIL Images
+        """
+        sources = [self.static_layer]
+        for (sprite, mask, icon_w, icon_h), (x, y) in zip(self.sprites, self.positions[0]):
+            swatch = self.static_layer.crop((x, y, x + icon_w, y + icon_h))
+            swatch.paste(sprite, (0, 0), mask)
+            sources.append(swatch)
+        return sources
+
+    def iter_frames(self):
+        """
+        Render frames lazily, one at a time
+
+        Yields:
+            Tuple (frame_num, RGB PIL Image, dirty rects)
+        """
+        for frame_num in range(self.total_frames):
+            yield frame_num, self.render_frame(frame_num), self.dirty_rects(frame_num)
+
+    def render_frame(self, frame_num):
+        """
+        Composite the icons for one frame onto a copy of the static layer
+
+        Args:
+            frame_num: Frame index
+
+        Returns:
+            RGB PIL Image
+        """
+        with span('compose', 'frame', frame=frame_num):
+            canvas = self.static_layer.copy()
+            for (sprite, mask, _, _), position in zip(self.sprites, self.positions[frame_num]):
+                canvas.paste(sprite, position, mask)
+        return canvas
+
+
+def build_animated_cover_scene(deals, font_path, pipeline=None):
+    """Load assets and render the static layer of the animated cover"""
+    if pipeline is None:
+        pipeline = DailyPipeline(deals=deals)
 
-
-def create_animated_cover(deals, font_path):
-    """Create animated TikTok cover page with floating icons"""
     print("Creating animated cover page...")
 
     # Create base gradient background
@@ -247,12 +225,9 @@ def create_animated_cover(deals, font_path):
 
     # Load logo
     try:
-        logo = Image.open(LOGO_PATH)
-        logo_max_width = 350
-        logo_ratio = logo_max_width / logo.width
-        logo_height = int(logo.height * logo_ratio)
-        logo = logo.resize((logo_max_width, logo_height), Image.Resampling.LANCZOS)
-        current_y = 60 + logo_height + 40
+        assets = get_asset_manager()
+        logo = assets.sprite(LOGO_PATH, assets.fit_width(LOGO_PATH, 350))
+        current_y = 60 + logo.height + 40
     except Exception as e:
         print(f"  Error loading logo: {e}")
         logo = None
@@ -260,9 +235,7 @@ def create_animated_cover(deals, font_path):
 
     # Load sparkle emoji
     try:
-        sparkle = Image.open(SPARKLE_EMOJI_PATH)
-        sparkle_size = 60
-        sparkle = sparkle.resize((sparkle_size, sparkle_size), Image.Resampling.LANCZOS)
+        sparkle = get_asset_manager().sprite(SPARKLE_EMOJI_PATH, 60)
     except:
         sparkle = None
 
@@ -271,27 +244,15 @@ def create_animated_cover(deals, font_path):
     title_font_size = 80
     title_y = current_y + 20
 
-    if font_path:
-        temp_font = ImageFont.truetype(font_path, title_font_size)
-        temp_draw = ImageDraw.Draw(base_canvas)
-        bbox = temp_draw.textbbox((0, 0), title_text, font=temp_font)
-        text_width = bbox[2] - bbox[0]
-    else:
-        text_width = len(title_text) * 40
+    # Measured once and redrawn from the cached layout in every frame
+    title_layout = measure_text(title_text, font_path, title_font_size)
+    text_width = title_layout.width
 
     title_x = (IMAGE_WIDTH - text_width) // 2
 
-    # Download and process product images
-    product_images = []
-    print("  Downloading and processing product images...")
-    for i, deal in enumerate(deals[:5]):
-        image_urls = deal.get('image_urls', [])
-        if image_urls:
-            product_img = download_image(image_urls[0])
-            if product_img:
-                product_img = remove_background(product_img)
-                product_images.append(product_img)
-                print(f"    Processed product {i+1}/{min(5, len(deals))}")
+    # Get processed product images (shared with the other generators)
+    print("  Collecting product images...")
+    product_images = pipeline.collage_images(5, use_overrides=False)
 
     content_start_y = title_y + 150
     content_height = IMAGE_HEIGHT - content_start_y - 50
@@ -308,27 +269,38 @@ def create_animated_cover(deals, font_path):
 
     for icon_path, x, y, size, movement in icon_configs:
         try:
-            icon = Image.open(icon_path)
-            icon = icon.resize((size, size), Image.Resampling.LANCZOS)
+            icon = get_asset_manager().sprite(icon_path, size)
             icon_data.append((icon, x, y, movement))
         except Exception as e:
             print(f"  Error loading icon {icon_path}: {e}")
 
-    # Generate frames
-    print(f"  Generating {NUM_FRAMES} frames...")
-    frames = []
-    for i in range(NUM_FRAMES):
-        frame = create_frame(i, NUM_FRAMES, base_canvas, logo, sparkle, product_images,
-                           font_path, title_x, title_y, text_width, content_start_y,
-                           content_height, icon_data)
-        frames.append(frame)
-        if (i + 1) % 10 == 0:
-            print(f"    Generated frame {i+1}/{NUM_FRAMES}")
+    print("  Rendering static layer...")
+    static_layer = build_static_layer(base_canvas, logo, sparkle, product_images, title_layout,
+                                      title_x, title_y, text_width, content_start_y, content_height)
+
+    return AnimatedCoverScene(static_layer, icon_data, NUM_FRAMES)
 
-    return frames
 
+def animated_cover_fingerprint(deals, font_path, pipeline, output_format):
+    """Fingerprint of the product images, assets and settings the animated cover is rendered from"""
+    assets = [pipeline.product_assets(deal) for deal in deals[:5]]
+    return fingerprint(
+        sources=[a.data if a else None for a in assets],
+        files=[__file__, LOGO_PATH, SPARKLE_EMOJI_PATH, MONEY_STACK_PATH, CREDIT_CARD_PATH,
+               GIFT_PATH, DISCOUNT_SIGN_PATH, font_path],
+        settings={'format': output_format, 'animation': config.ANIMATION,
+                  'video': config.VIDEO.get(output_format)},
+    )
 
-def main():
+
+def create_animated_cover(deals, font_path, pipeline=None):
+    """Create animated TikTok cover page with floating icons, yielding frames lazily"""
+    scene = build_animated_cover_scene(deals, font_path, pipeline)
+    for _, frame, _ in scene.iter_frames():
+        yield frame
+
+
+def main(pipeline=None):
     """Main function to generate animated cover page"""
     print("=" * 50)
     print("TikTok Animated Cover Page Generator")
@@ -341,40 +313,84 @@ def main():
 
     # Create output directory
     today = datetime.now().strftime("%Y-%m-%d")
-    output_dir = os.path.join(OUTPUT_BASE_DIR, today)
+    output_dir = os.path.join(config.OUTPUT['base_dir'], today)
     os.makedirs(output_dir, exist_ok=True)
     print(f"Output directory: {output_dir}")
 
-    # Fetch deals
-    deals = fetch_deals()
+    # Fetch deals (once per run, shared through the pipeline)
+    if pipeline is None:
+        pipeline = DailyPipeline()
+    deals = pipeline.deals
     print(f"Found {len(deals)} deals")
 
     if not deals:
         print("No deals found. Exiting.")
         return
 
-    # Generate animated cover page
+    # Generate animated cover page, unless the products in it are unchanged
     try:
-        frames = create_animated_cover(deals, font_path)
+        output_format = config.OUTPUT['formats'].get('cover_animated', 'gif')
+        if output_format in VIDEO_FORMATS and not video_encoder_available():
+            print(f"  Warning: no ffmpeg or PyAV found, saving GIF instead of {output_format}")
+            output_format = 'gif'
 
-        # Save as GIF
-        filename = "cover_page_animated.gif"
+        filename = f"cover_page_animated.{output_format}"
         filepath = os.path.join(output_dir, filename)
 
-        print(f"\n  Saving animated GIF...")
-        frames[0].save(
-            filepath,
-            save_all=True,
-            append_images=frames[1:],
-            duration=FRAME_DURATION,
-            loop=0,  # Loop forever
-            optimize=False
-        )
-
+        pipeline.download_all(collage_limit=0)
+        build = BuildManifest(output_dir)
+        cover_fp = animated_cover_fingerprint(deals, font_path, pipeline, output_format)
+        if build.is_current(filename, cover_fp):
+            print(f"✓ Animated cover page is up to date: {filepath}")
+            print("=" * 50)
+            return
+
+        pipeline.prepare(collage_limit=0, product_deals=deals[:5])
+        with span('compose', 'animated cover static layer'):
+            scene = build_animated_cover_scene(deals, font_path, pipeline)
+
+        print(f"\n  Encoding animated {output_format.upper()} ({scene.total_frames} frames)...")
+        start = time.perf_counter()
+        if output_format in VIDEO_FORMATS:
+            # Frames are piped to the encoder one at a time
+            writer = VideoWriter(filepath, scene.size, duration=FRAME_DURATION, video_format=output_format)
+        else:
+            # GIF: one global palette, then only the changed pixels per frame
+            with span('encode', 'palette'):
+                palette = build_global_palette(scene.palette_sources())
+            loop = 0 if config.ANIMATION.get('loop', True) else None  # 0 = loop forever
+            writer = GifWriter(filepath, palette, duration=FRAME_DURATION, loop=loop)
+        sampler = FrameSampler(scene.total_frames, config.ANIMATION.get('preview_frames', 0))
+        frames = prefetch(scene.iter_frames(), config.ANIMATION.get('prefetch_frames', 2))
+        try:
+            for frame_num, frame, dirty_rects in frames:
+                with span('encode', 'frame', frame=frame_num):
+                    writer.add_frame(frame, dirty_rects)
+                sampler.offer(frame_num, frame)
+        finally:
+            with span('encode', f"finish {output_format}"):
+                writer.close()
+        elapsed = time.perf_counter() - start
+        count('save.bytes', os.path.getsize(filepath))
+
+        build.record(filename, cover_fp)
+        build.save()
         print(f"✓ Animated cover page saved: {filepath}")
 
         file_size = os.path.getsize(filepath) / (1024 * 1024)  # Size in MB
         print(f"  File size: {file_size:.2f} MB")
+        print(f"  Encode time: {writer.encode_seconds:.2f}s ({elapsed:.2f}s including frame rendering)")
+
+        preview = sampler.contact_sheet()
+        if preview is not None:
+            # Under the gitignored cache directory, so neither the uploader nor
+            # the daily commit of generated_images/ picks it up
+            preview_dir = os.path.join(config.CACHE['base_dir'], config.ANIMATION['preview_dir'], today)
+            os.makedirs(preview_dir, exist_ok=True)
+            preview_path = os.path.join(preview_dir, 'cover_page_animated_preview.png')
+            with span('save', os.path.basename(preview_path)):
+                preview.save(preview_path, 'PNG')
+            print(f"  Preview: {preview_path}")
 
     except Exception as e:
         print(f"✗ Error creating animated cover page: {e}")
@@ -385,4 +401,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    run_main(main, 'generate_animated_cover')
@@ -4,57 +4,17 @@ TikTok Caption Generator
 Generates engaging captions for daily deal posts
 """
 
-import requests
+import os
 import random
 from datetime import datetime
 
-
-# Configuration
-API_URL = "https://item-api-rosy.vercel.app/api/deals"
-
-
-def calculate_discount_percentage(current_price, original_price):
-    """Calculate discount percentage using the formula: 1-(discount price / full price) * 100"""
-    if original_price == 0:
-        return 0
-    discount = (1 - (current_price / original_price)) * 100
-    return round(discount)
-
-
-def fetch_deals():
-    """Fetch deals from API"""
-    try:
-        response = requests.get(API_URL)
-        response.raise_for_status()
-        data = response.json()
-        return data.get('deals', [])
-    except Exception as e:
-        print(f"Error fetching deals: {e}")
-        return []
+from config import creative_config as config
+from lib.deals import load_deals
 
 
 def get_deal_text(deal):
     """Format a single deal for the caption"""
-    brand = deal.get('brand', 'Unknown')
-    current_price = deal.get('current_price', 0)
-
-    # Try to get original price from best_promo_code or estimate
-    best_promo = deal.get('best_promo_code', {})
-    if best_promo and best_promo.get('price_after_applied'):
-        promo_price = best_promo.get('price_after_applied', 0)
-        if promo_price < current_price:
-            original_price = current_price
-            discount_price = promo_price
-        else:
-            original_price = current_price * 1.25
-            discount_price = current_price
-    else:
-        discount_price = current_price
-        original_price = current_price * 1.25
-
-    discount_percent = calculate_discount_percentage(discount_price, original_price)
-
-    return f"{brand} - {discount_percent}% off sitewide"
+    return f"{deal.brand} - {deal.discount_percent}% off sitewide"
 
 
 def generate_caption(deals):
@@ -111,8 +71,8 @@ def main():
     print("TikTok Caption Generator")
     print("=" * 50)
 
-    # Fetch deals
-    deals = fetch_deals()
+    # Read today's deals snapshot (fetched from the API only if missing)
+    deals = load_deals()
     print(f"Found {len(deals)} deals\n")
 
     if not deals:
@@ -129,12 +89,11 @@ def main():
     print("-" * 50)
 
     # Save to file
-    today = datetime.now().strftime("%Y-%m-%d")
-    output_dir = f"generated_images/{today}"
-    import os
+    today = datetime.now().strftime(config.OUTPUT['date_format'])
+    output_dir = os.path.join(config.OUTPUT['base_dir'], today)
     os.makedirs(output_dir, exist_ok=True)
 
-    caption_file = f"{output_dir}/caption.txt"
+    caption_file = os.path.join(output_dir, "caption.txt")
     with open(caption_file, 'w') as f:
         f.write(caption)
 
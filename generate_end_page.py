@@ -5,17 +5,25 @@ Creates an end page with "grab discounts, link in bio" text
 """
 
 import os
-import requests
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
-from io import BytesIO
-from rembg import remove
+from PIL import ImageDraw
+
+from config import creative_config as config
+from lib.font_registry import get_font_registry
+from lib.text_utils import measure_text, draw_text_layout
+from lib.image_utils import create_gradient_background
+from lib.assets import get_asset_manager
+from lib.collage import arrange_products_collage
+from lib.pipeline import DailyPipeline
+from lib.profiling import run_main
+from lib.instrumentation import span
+from lib.build_manifest import BuildManifest, fingerprint
+from lib.output_encoder import save_output
+from lib.output_formats import output_filename
 
 
 # Configuration
-API_URL = "https://item-api-rosy.vercel.app/api/deals"
 LOGO_PATH = "DecoyWizard.png"
-OUTPUT_BASE_DIR = "generated_images"
 IMAGE_WIDTH = 1080
 IMAGE_HEIGHT = 1920
 
@@ -26,107 +34,29 @@ CREDIT_CARD_PATH = "CreditCard.png"
 GIFT_PATH = "Gift.png"
 DISCOUNT_SIGN_PATH = "discountsign.png"
 
-# Font paths
-FONT_PATHS_MEDIUM = [
-    "/Library/Fonts/SF-Pro-Rounded-Medium.otf",
-    "/System/Library/Fonts/SFProRounded-Medium.ttf",
-    "/System/Library/Fonts/Supplemental/SF-Pro-Rounded-Medium.otf",
-    "/System/Library/Fonts/SF-Pro-Medium.ttf",
-]
-
 
 def get_font_path(weight='medium'):
-    """Find available SF Pro Rounded font with specified weight"""
-    paths = FONT_PATHS_MEDIUM
-
-    for path in paths:
-        if os.path.exists(path):
-            return path
-
-    print("Warning: SF Pro Rounded Medium not found, using default font")
-    return None
-
-
-def create_gradient_background(width, height):
-    """Create a gradient background from light blue to pink"""
-    img = Image.new('RGB', (width, height), '#FFFFFF')
-    draw = ImageDraw.Draw(img)
-
-    # Define colors (light blue to pink)
-    color_start = (190, 227, 248)  # Light blue
-    color_end = (239, 198, 237)    # Light pink
-
-    # Create vertical gradient
-    for y in range(height):
-        ratio = y / height
-        r = int(color_start[0] + (color_end[0] - color_start[0]) * ratio)
-        g = int(color_start[1] + (color_end[1] - color_start[1]) * ratio)
-        b = int(color_start[2] + (color_end[2] - color_start[2]) * ratio)
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
-
-    return img
-
-
-def fetch_deals():
-    """Fetch deals from API"""
-    print("Fetching deals from API...")
-    try:
-        response = requests.get(API_URL)
-        response.raise_for_status()
-        data = response.json()
-        return data.get('deals', [])
-    except Exception as e:
-        print(f"Error fetching deals: {e}")
-        return []
+    """Find available SF Pro Rounded font with specified weight (bundled fallback on Linux)"""
+    return get_font_registry().resolve(weight, config.COLLAGE_FONT_CANDIDATES.get(weight))
 
 
-def download_image(url):
-    """Download image from URL"""
+def add_text_with_shadow(draw, layout, position, fill='white', shadow_offset=5):
+    """Add measured text with shadow effect"""
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return Image.open(BytesIO(response.content))
-    except Exception as e:
-        print(f"Error downloading image from {url}: {e}")
-        return None
-
-
-def remove_background(image):
-    """Remove background from image using rembg"""
-    try:
-        img_byte_arr = BytesIO()
-        image.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
-        output = remove(img_byte_arr.read())
-        return Image.open(BytesIO(output))
-    except Exception as e:
-        print(f"  Error removing background: {e}")
-        return image
-
-
-def add_text_with_shadow(draw, text, position, font_size, font_path, fill='white', shadow_offset=5):
-    """Add text with shadow effect"""
-    try:
-        if font_path:
-            font = ImageFont.truetype(font_path, font_size)
-        else:
-            font = ImageFont.load_default()
-
-        x, y = position
-
-        # Draw shadow (slightly offset, darker)
-        shadow_color = (180, 180, 180, 200)  # Light gray shadow
-        draw.text((x + shadow_offset, y + shadow_offset), text, font=font, fill=shadow_color)
-
-        # Draw main text
-        draw.text((x, y), text, font=font, fill=fill)
+        # Light gray shadow, slightly offset
+        shadow_color = (180, 180, 180, 200)
+        draw_text_layout(draw, layout, position, fill,
+                         shadow_offset=shadow_offset, shadow_fill=shadow_color)
 
     except Exception as e:
         print(f"  Error adding text: {e}")
 
 
-def create_end_page(deals, font_path):
+def create_end_page(deals, font_path, pipeline=None):
     """Create TikTok end page with multiple products"""
+    if pipeline is None:
+        pipeline = DailyPipeline(deals=deals)
+
     print("Creating end page...")
 
     # Create gradient background
@@ -134,11 +64,10 @@ def create_end_page(deals, font_path):
 
     # Load and add logo at the top
     try:
-        logo = Image.open(LOGO_PATH)
+        assets = get_asset_manager()
         logo_max_width = 350
-        logo_ratio = logo_max_width / logo.width
-        logo_height = int(logo.height * logo_ratio)
-        logo = logo.resize((logo_max_width, logo_height), Image.Resampling.LANCZOS)
+        logo = assets.sprite(LOGO_PATH, assets.fit_width(LOGO_PATH, logo_max_width))
+        logo_height = logo.height
 
         logo_x = (IMAGE_WIDTH - logo_max_width) // 2
         logo_y = 60
@@ -158,9 +87,8 @@ def create_end_page(deals, font_path):
 
     # Load sparkle emoji
     try:
-        sparkle = Image.open(SPARKLE_EMOJI_PATH)
         sparkle_size = 60
-        sparkle = sparkle.resize((sparkle_size, sparkle_size), Image.Resampling.LANCZOS)
+        sparkle = get_asset_manager().sprite(SPARKLE_EMOJI_PATH, sparkle_size)
     except:
         sparkle = None
 
@@ -169,16 +97,12 @@ def create_end_page(deals, font_path):
     line1_font_size = 80
     line1_y = current_y + 20
 
-    # Calculate text width for centering
-    if font_path:
-        temp_font = ImageFont.truetype(font_path, line1_font_size)
-        bbox = draw.textbbox((0, 0), line1_text, font=temp_font)
-        line1_width = bbox[2] - bbox[0]
-    else:
-        line1_width = len(line1_text) * 40  # Estimate
+    # Measure once; the layout is reused for centering and drawing
+    line1_layout = measure_text(line1_text, font_path, line1_font_size)
+    line1_width = line1_layout.width
 
     line1_x = (IMAGE_WIDTH - line1_width) // 2
-    add_text_with_shadow(draw, line1_text, (line1_x, line1_y), line1_font_size, font_path, fill='white', shadow_offset=5)
+    add_text_with_shadow(draw, line1_layout, (line1_x, line1_y), fill='white', shadow_offset=5)
 
     # Add sparkles on both sides of first line
     if sparkle:
@@ -198,80 +122,16 @@ def create_end_page(deals, font_path):
     line2_font_size = 80
     line2_y = line1_y + 100  # Space between lines
 
-    # Calculate text width for centering
-    if font_path:
-        bbox2 = draw.textbbox((0, 0), line2_text, font=temp_font)
-        line2_width = bbox2[2] - bbox2[0]
-    else:
-        line2_width = len(line2_text) * 40  # Estimate
+    # Measure once; the layout is reused for centering and drawing
+    line2_layout = measure_text(line2_text, font_path, line2_font_size)
+    line2_width = line2_layout.width
 
     line2_x = (IMAGE_WIDTH - line2_width) // 2
-    add_text_with_shadow(draw, line2_text, (line2_x, line2_y), line2_font_size, font_path, fill='white', shadow_offset=5)
-
-    # Download and process product images
-    product_images = []
-    print("  Downloading and processing product images...")
-    for i, deal in enumerate(deals[:5]):  # Limit to 5 products
-        image_urls = deal.get('image_urls', [])
-        brand = deal.get('brand', '')
-        if image_urls:
-            # Use specific high-quality images for certain brands
-            if brand == 'Vuori':
-                image_url = 'https://cdn.shopify.com/s/files/1/0022/4008/6074/products/V8003STY_539d9e62-f5d3-4524-ba57-0301aeafb764.jpg?v=1754073098'
-            elif brand == 'Mejuri':
-                # Use local high-quality image
-                try:
-                    product_img = Image.open('generated_images/2025-10-27/mejuri_earings.png')
-                    product_img = remove_background(product_img)
-                    product_images.append(product_img)
-                    print(f"    Processed product {i+1}/{min(5, len(deals))}")
-                    continue
-                except:
-                    image_url = image_urls[0]
-            elif brand == 'Byredo':
-                # Use local high-quality image (already has proper background)
-                try:
-                    product_img = Image.open('generated_images/2025-10-28/byredo.png')
-                    product_images.append(product_img)
-                    print(f"    Processed product {i+1}/{min(5, len(deals))}")
-                    continue
-                except:
-                    image_url = image_urls[0]
-            elif brand == 'Garrett Leight':
-                # Use local high-quality image (already has proper background)
-                try:
-                    product_img = Image.open('generated_images/2025-10-28/garretlight.png')
-                    product_images.append(product_img)
-                    print(f"    Processed product {i+1}/{min(5, len(deals))}")
-                    continue
-                except:
-                    image_url = image_urls[0]
-            elif brand == 'Skullcandy':
-                # Use local high-quality image (already has proper background)
-                try:
-                    product_img = Image.open('generated_images/2025-10-29/skullcandy.webp')
-                    product_images.append(product_img)
-                    print(f"    Processed product {i+1}/{min(5, len(deals))}")
-                    continue
-                except:
-                    image_url = image_urls[0]
-            elif brand == 'Gap':
-                # Use local high-quality image (already has proper background)
-                try:
-                    product_img = Image.open('generated_images/2025-10-29/gap.avif')
-                    product_images.append(product_img)
-                    print(f"    Processed product {i+1}/{min(5, len(deals))}")
-                    continue
-                except:
-                    image_url = image_urls[0]
-            else:
-                image_url = image_urls[0]
+    add_text_with_shadow(draw, line2_layout, (line2_x, line2_y), fill='white', shadow_offset=5)
 
-            product_img = download_image(image_url)
-            if product_img:
-                product_img = remove_background(product_img)
-                product_images.append(product_img)
-                print(f"    Processed product {i+1}/{min(5, len(deals))}")
+    # Get processed product images (shared with the other generators)
+    print("  Collecting product images...")
+    product_images = pipeline.collage_images(5)  # Limit to 5 products
 
     # Arrange products in the same layout as cover page
     content_start_y = line2_y + 150
@@ -286,64 +146,6 @@ def create_end_page(deals, font_path):
     return canvas
 
 
-def arrange_products_collage(canvas, product_images, start_y, available_height):
-    """Arrange products in a clustered collage style with slight overlap"""
-
-    # Define the content area (centered) - same as cover page
-    content_width = IMAGE_WIDTH - 200
-    content_x_offset = 100
-
-    # Products clustered more tightly in center with slight overlaps
-    # Increased sizes for better visibility - same as cover page
-    positions = [
-        # Format: (x_ratio, y_ratio, size, rotation)
-        (0.25, 0.20, 0.38, -18),   # Top left - bigger
-        (0.60, 0.18, 0.42, 15),    # Top right - bigger
-        (0.30, 0.48, 0.36, -10),   # Middle left - bigger
-        (0.68, 0.52, 0.39, 20),    # Middle right - bigger
-        (0.48, 0.75, 0.41, -12),   # Bottom center - bigger
-    ]
-
-    for i, product_img in enumerate(product_images):
-        if i >= len(positions):
-            break
-
-        x_ratio, y_ratio, size_ratio, rotation = positions[i]
-
-        # Calculate size
-        max_size = int(available_height * size_ratio)
-
-        # Resize product maintaining aspect ratio
-        aspect_ratio = product_img.width / product_img.height
-        if aspect_ratio > 1:
-            # Wider than tall
-            new_width = max_size
-            new_height = int(max_size / aspect_ratio)
-        else:
-            # Taller than wide
-            new_height = max_size
-            new_width = int(max_size * aspect_ratio)
-
-        product_img_resized = product_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-        # Rotate image
-        product_img_rotated = product_img_resized.rotate(rotation, expand=True, resample=Image.Resampling.BICUBIC)
-
-        # Calculate position within content area
-        x = content_x_offset + int(content_width * x_ratio)
-        y = int(start_y + available_height * y_ratio)
-
-        # Center the image at the position
-        x -= product_img_rotated.width // 2
-        y -= product_img_rotated.height // 2
-
-        # Paste product
-        if product_img_rotated.mode == 'RGBA':
-            canvas.paste(product_img_rotated, (x, y), product_img_rotated)
-        else:
-            canvas.paste(product_img_rotated, (x, y))
-
-
 def add_decorative_icons(canvas):
     """Add decorative icons (money, gift, credit card, discount sign) - identical to cover page"""
     # Larger icons positioned in corners and edges to avoid overlap with products
@@ -357,8 +159,7 @@ def add_decorative_icons(canvas):
 
     for icon_path, x, y, size in icons:
         try:
-            icon = Image.open(icon_path)
-            icon = icon.resize((size, size), Image.Resampling.LANCZOS)
+            icon = get_asset_manager().sprite(icon_path, size)
 
             if icon.mode == 'RGBA':
                 canvas.paste(icon, (x, y), icon)
@@ -368,7 +169,18 @@ def add_decorative_icons(canvas):
             print(f"  Error adding icon {icon_path}: {e}")
 
 
-def main():
+def end_fingerprint(deals, font_path, pipeline):
+    """Fingerprint of the product images and assets the end page is rendered from"""
+    assets = [pipeline.collage_assets(deal) for deal in deals[:5]]
+    return fingerprint(
+        sources=[a.data if a else None for a in assets],
+        files=[__file__, LOGO_PATH, SPARKLE_EMOJI_PATH, MONEY_STACK_PATH, CREDIT_CARD_PATH,
+               GIFT_PATH, DISCOUNT_SIGN_PATH, font_path],
+        settings={'cutouts': [a.needs_cutout if a else None for a in assets]},
+    )
+
+
+def main(pipeline=None):
     """Main function to generate end page"""
     print("=" * 50)
     print("TikTok End Page Generator")
@@ -381,26 +193,40 @@ def main():
 
     # Create output directory
     today = datetime.now().strftime("%Y-%m-%d")
-    output_dir = os.path.join(OUTPUT_BASE_DIR, today)
+    output_dir = os.path.join(config.OUTPUT['base_dir'], today)
     os.makedirs(output_dir, exist_ok=True)
     print(f"Output directory: {output_dir}")
 
-    # Fetch deals
-    deals = fetch_deals()
+    # Fetch deals (once per run, shared through the pipeline)
+    if pipeline is None:
+        pipeline = DailyPipeline()
+    deals = pipeline.deals
     print(f"Found {len(deals)} deals")
 
     if not deals:
         print("No deals found. Exiting.")
         return
 
-    # Generate end page
+    # Generate end page, unless the products in it are unchanged
     try:
-        image = create_end_page(deals, font_path)
-
-        # Save image
-        filename = "end_page.png"
+        filename = output_filename('end_page', 'end')
         filepath = os.path.join(output_dir, filename)
-        image.save(filepath, 'PNG')
+        pipeline.download_all(collage_limit=5)
+        build = BuildManifest(output_dir)
+        page_fp = end_fingerprint(deals, font_path, pipeline)
+        if build.is_current(filename, page_fp):
+            print(f"\n✓ End page is up to date: {filepath}")
+            print("=" * 50)
+            return
+
+        pipeline.prepare(collage_limit=5, product_deals=[])
+        with span('compose', 'end page'):
+            image = create_end_page(deals, font_path, pipeline)
+
+        # Save image in the configured format
+        save_output(image, filepath)
+        build.record(filename, page_fp)
+        build.save()
         print(f"\n✓ End page saved: {filepath}")
     except Exception as e:
         print(f"✗ Error creating end page: {e}")
@@ -411,4 +237,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    run_main(main, 'generate_end_page')
@@ -5,188 +5,68 @@ Automatically pulls data from API and creates promotional images
 """
 
 import os
-import requests
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
-from io import BytesIO
-from rembg import remove
-import math
+from PIL import Image, ImageDraw
+
+from config import creative_config as config
+from lib.font_registry import get_font_registry
+from lib.image_utils import create_gradient_background
+from lib.assets import get_asset_manager
+from lib.text_utils import measure_text, draw_text_layout
+from lib.pipeline import DailyPipeline
+from lib.profiling import run_main
+from lib.instrumentation import span, get_tracer
+from lib.build_manifest import BuildManifest, fingerprint
+from lib.render_store import get_render_store
+from lib.output_encoder import OutputEncoder, save_output, remove_stale_variants
+from lib.output_formats import output_filename
 
 
 # Configuration
-API_URL = "https://item-api-rosy.vercel.app/api/deals"
 LOGO_PATH = "DecoyWizard.png"
-OUTPUT_BASE_DIR = "generated_images"
 IMAGE_WIDTH = 1080
 IMAGE_HEIGHT = 1920
-
-# SF Pro Rounded font paths (fallback to system fonts if not available)
-FONT_PATHS_MEDIUM = [
-    "/System/Library/Fonts/SFProRounded-Medium.ttf",
-    "/System/Library/Fonts/Supplemental/SF-Pro-Rounded-Medium.otf",
-    "/Library/Fonts/SF-Pro-Rounded-Medium.otf",
-    "/System/Library/Fonts/SF-Pro-Medium.ttf",
-]
-
-FONT_PATHS_LIGHT = [
-    "/System/Library/Fonts/SFProRounded-Light.ttf",
-    "/System/Library/Fonts/Supplemental/SF-Pro-Rounded-Light.otf",
-    "/Library/Fonts/SF-Pro-Rounded-Light.otf",
-    "/System/Library/Fonts/SF-Pro-Light.ttf",
-]
-
-FONT_PATHS_REGULAR = [
-    "/System/Library/Fonts/SFProRounded.ttf",
-    "/System/Library/Fonts/Supplemental/SF-Pro-Rounded-Regular.otf",
-    "/Library/Fonts/SF-Pro-Rounded-Regular.otf",
-    "/System/Library/Fonts/SF-Pro.ttf",
-]
+BRAND_FONT_SIZE = 70
+DISCOUNT_FONT_SIZE = 55
 
 
 def get_font_path(weight='regular'):
-    """Find available SF Pro Rounded font with specified weight"""
-    if weight == 'medium':
-        paths = FONT_PATHS_MEDIUM
-    elif weight == 'light':
-        paths = FONT_PATHS_LIGHT
-    else:
-        paths = FONT_PATHS_REGULAR
-
-    for path in paths:
-        if os.path.exists(path):
-            return path
-
-    # If specific weight not found, try regular as fallback
-    if weight != 'regular':
-        print(f"Warning: SF Pro Rounded {weight} not found, trying regular")
-        for path in FONT_PATHS_REGULAR:
-            if os.path.exists(path):
-                return path
-
-    # If no SF Pro font found, try to use system default
-    print("Warning: SF Pro Rounded font not found, using default font")
-    return None
+    """Find available SF Pro Rounded font with specified weight (bundled fallback on Linux)"""
+    return get_font_registry().resolve(weight)
 
 
-def calculate_discount_percentage(current_price, original_price):
-    """Calculate discount percentage using the formula: 1-(discount price / full price) * 100"""
-    if original_price == 0:
-        return 0
-    discount = (1 - (current_price / original_price)) * 100
-    return round(discount)
-
-
-def fetch_deals():
-    """Fetch deals from API"""
-    print("Fetching deals from API...")
-    try:
-        response = requests.get(API_URL)
-        response.raise_for_status()
-        data = response.json()
-        return data.get('deals', [])
-    except Exception as e:
-        print(f"Error fetching deals: {e}")
-        return []
+def load_logo(max_width=300):
+    """Load the logo resized to max_width, once per process"""
+    assets = get_asset_manager()
+    return assets.sprite(LOGO_PATH, assets.fit_width(LOGO_PATH, max_width))
 
 
-def download_image(url):
-    """Download image from URL"""
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return Image.open(BytesIO(response.content))
-    except Exception as e:
-        print(f"Error downloading image from {url}: {e}")
-        return None
-
-
-def remove_background(image):
-    """Remove background from image using rembg"""
-    try:
-        print("  Removing background...")
-        # Convert to bytes
-        img_byte_arr = BytesIO()
-        image.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
-
-        # Remove background
-        output = remove(img_byte_arr.read())
-
-        # Convert back to PIL Image
-        return Image.open(BytesIO(output))
-    except Exception as e:
-        print(f"  Error removing background: {e}")
-        return image
+def create_tiktok_image(deal, font_path_medium, font_path_light, pipeline=None):
+    """Create TikTok image asset for a deal, reusing the pipeline's product assets"""
+    if pipeline is None:
+        pipeline = DailyPipeline(deals=[deal])
 
+    product = pipeline.product_assets(deal)
+    product_img = product.cutout if product else None
+    return compose_tiktok_image(deal, product_img, font_path_medium, font_path_light)
 
-def create_gradient_background(width, height):
-    """Create a gradient background from light blue to pink"""
-    # Create a new image
-    img = Image.new('RGB', (width, height), '#FFFFFF')
-    draw = ImageDraw.Draw(img)
 
-    # Define colors (light blue to pink)
-    color_start = (190, 227, 248)  # Light blue
-    color_end = (239, 198, 237)    # Light pink
-
-    # Create vertical gradient
-    for y in range(height):
-        # Calculate interpolation factor
-        ratio = y / height
-
-        # Interpolate between colors
-        r = int(color_start[0] + (color_end[0] - color_start[0]) * ratio)
-        g = int(color_start[1] + (color_end[1] - color_start[1]) * ratio)
-        b = int(color_start[2] + (color_end[2] - color_start[2]) * ratio)
-
-        # Draw line
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
-
-    return img
-
-
-def add_text_with_font(draw, text, position, font_size, font_path, fill='black', align='left'):
-    """Add text to image with specified font"""
-    try:
-        if font_path:
-            font = ImageFont.truetype(font_path, font_size)
-        else:
-            font = ImageFont.load_default()
-
-        # Get text bbox for alignment
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-
-        # Adjust position based on alignment
-        x, y = position
-        if align == 'center':
-            x = x - text_width // 2
-
-        draw.text((x, y), text, font=font, fill=fill)
-        return bbox[3] - bbox[1]  # Return text height
-    except Exception as e:
-        print(f"  Error adding text: {e}")
-        # Fallback to default font
-        font = ImageFont.load_default()
-        draw.text(position, text, font=font, fill=fill)
-        return 20
-
-
-def create_tiktok_image(deal, font_path_medium, font_path_light):
-    """Create TikTok image asset for a deal"""
-    print(f"Creating image for: {deal.get('brand', 'Unknown')} - {deal.get('name', 'Unknown')}")
+def compose_tiktok_image(deal, product_img, font_path_medium, font_path_light):
+    """Compose the slide for a deal from its already background-removed product image"""
+    print(f"Creating image for: {deal.brand} - {deal.name or 'Unknown'}")
 
     # Create gradient background
     canvas = create_gradient_background(IMAGE_WIDTH, IMAGE_HEIGHT)
 
     # Load and add logo at the top
     try:
-        logo = Image.open(LOGO_PATH)
         # Resize logo to fit (max 300px wide)
         logo_max_width = 300
-        logo_ratio = logo_max_width / logo.width
-        logo_height = int(logo.height * logo_ratio)
-        logo = logo.resize((logo_max_width, logo_height), Image.Resampling.LANCZOS)
+        logo = load_logo(logo_max_width)
+        logo_height = logo.height
 
         # Center logo at top
         logo_x = (IMAGE_WIDTH - logo_max_width) // 2
@@ -215,60 +95,22 @@ def create_tiktok_image(deal, font_path_medium, font_path_light):
     box_coords = [box_margin, box_y, IMAGE_WIDTH - box_margin, box_y + box_height]
     draw.rounded_rectangle(box_coords, radius=15, fill='white')
 
-    # Calculate discount percentage first
-    current_price = deal.get('current_price', 0)
-
-    # Try to get original price from best_promo_code or estimate from current price
-    best_promo = deal.get('best_promo_code', {})
-    if best_promo and best_promo.get('price_after_applied'):
-        # The current_price might be the original, and price_after_applied is discounted
-        # Or vice versa - we need to figure out which is which
-        promo_price = best_promo.get('price_after_applied', 0)
-        if promo_price < current_price:
-            # current_price is original, promo_price is discounted
-            original_price = current_price
-            discount_price = promo_price
-        else:
-            # Assume current_price is already discounted
-            # Estimate original price
-            original_price = current_price * 1.25  # Assume at least 20% off
-            discount_price = current_price
-    else:
-        # Estimate based on typical discount
-        discount_price = current_price
-        original_price = current_price * 1.25
-
-    discount_percent = calculate_discount_percentage(discount_price, original_price)
-
     # Calculate text dimensions for centering
-    brand_font_size = 70
-    discount_font_size = 55
+    brand_font_size = BRAND_FONT_SIZE
+    discount_font_size = DISCOUNT_FONT_SIZE
     text_spacing = 20  # Space between brand and discount text
 
     # Get actual text and prepare fonts
-    brand = deal.get('brand', '').lower()
-    discount_text = f"{discount_percent}% off sitewide"
-
-    # Measure text at a fixed baseline position to get accurate bounding boxes
-    baseline_y = 1000  # Arbitrary baseline position for measurement
-
-    if font_path_medium:
-        brand_font = ImageFont.truetype(font_path_medium, brand_font_size)
-        brand_bbox = draw.textbbox((500, baseline_y), brand, font=brand_font)
-    else:
-        brand_font = None
-        brand_bbox = (500, baseline_y, 500 + brand_font_size * 5, baseline_y + brand_font_size)
+    brand = deal.brand.lower()
+    discount_text = f"{deal.discount_percent}% off sitewide"
 
-    if font_path_light:
-        discount_font = ImageFont.truetype(font_path_light, discount_font_size)
-        discount_bbox = draw.textbbox((500, baseline_y + 100), discount_text, font=discount_font)
-    else:
-        discount_font = None
-        discount_bbox = (500, baseline_y + 100, 500 + discount_font_size * 10, baseline_y + 100 + discount_font_size)
+    # Measure each line once; bbox offsets are relative to the draw origin
+    brand_layout = measure_text(brand, font_path_medium, brand_font_size)
+    discount_layout = measure_text(discount_text, font_path_light, discount_font_size)
 
     # Calculate the actual visual heights and spacing
-    brand_visual_height = brand_bbox[3] - brand_bbox[1]
-    discount_visual_height = discount_bbox[3] - discount_bbox[1]
+    brand_visual_height = brand_layout.height
+    discount_visual_height = discount_layout.height
 
     # Total visual height of both text elements plus spacing
     total_text_height = brand_visual_height + text_spacing + discount_visual_height
@@ -279,57 +121,125 @@ def create_tiktok_image(deal, font_path_medium, font_path_light):
 
     # Position brand text at the top of the group
     # Account for the offset between bbox top and the anchor point
-    brand_y = group_start_y - brand_bbox[1] + baseline_y
-    add_text_with_font(draw, brand, (IMAGE_WIDTH // 2, brand_y), brand_font_size, font_path_medium,
-                      fill='black', align='center')
+    brand_y = group_start_y - brand_layout.bbox[1]
+    draw_text_layout(draw, brand_layout, (IMAGE_WIDTH // 2, brand_y), fill='black', align='center')
 
     # Position discount text below brand text
-    discount_y = group_start_y + brand_visual_height + text_spacing - discount_bbox[1] + baseline_y + 100
-    add_text_with_font(draw, discount_text, (IMAGE_WIDTH // 2, discount_y), discount_font_size, font_path_light,
-                      fill='#666666', align='center')
-
-    # Download and process product image
-    image_urls = deal.get('image_urls', [])
-    if image_urls:
-        product_img = download_image(image_urls[0])
-        if product_img:
-            # Remove background
-            product_img = remove_background(product_img)
-
-            # Calculate available space for product image
-            # Space between bottom of text box and bottom of canvas
-            available_space_top = box_y + box_height
-            available_space_bottom = IMAGE_HEIGHT
-            available_height = available_space_bottom - available_space_top
-
-            # Resize product image to fit nicely (with some padding)
-            max_product_width = IMAGE_WIDTH - 100
-            max_product_height = available_height - 100  # Leave padding
-
-            # Calculate resize ratio
-            width_ratio = max_product_width / product_img.width
-            height_ratio = max_product_height / product_img.height
-            resize_ratio = min(width_ratio, height_ratio, 1.5)  # Don't upscale too much
-
-            new_width = int(product_img.width * resize_ratio)
-            new_height = int(product_img.height * resize_ratio)
-
-            product_img = product_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-            # Center product image vertically between bottom of box and bottom of canvas
-            product_x = (IMAGE_WIDTH - new_width) // 2
-            product_y = available_space_top + (available_height - new_height) // 2
-
-            # Paste product image
-            if product_img.mode == 'RGBA':
-                canvas.paste(product_img, (product_x, product_y), product_img)
-            else:
-                canvas.paste(product_img, (product_x, product_y))
+    discount_y = group_start_y + brand_visual_height + text_spacing - discount_layout.bbox[1]
+    draw_text_layout(draw, discount_layout, (IMAGE_WIDTH // 2, discount_y), fill='#666666', align='center')
+
+    # Add downloaded, background-removed product image
+    if product_img:
+        # Calculate available space for product image
+        # Space between bottom of text box and bottom of canvas
+        available_space_top = box_y + box_height
+        available_space_bottom = IMAGE_HEIGHT
+        available_height = available_space_bottom - available_space_top
+
+        # Resize product image to fit nicely (with some padding)
+        max_product_width = IMAGE_WIDTH - 100
+        max_product_height = available_height - 100  # Leave padding
+
+        # Calculate resize ratio
+        width_ratio = max_product_width / product_img.width
+        height_ratio = max_product_height / product_img.height
+        resize_ratio = min(width_ratio, height_ratio, 1.5)  # Don't upscale too much
+
+        new_width = int(product_img.width * resize_ratio)
+        new_height = int(product_img.height * resize_ratio)
+
+        product_img = product_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+        # Center product image vertically between bottom of box and bottom of canvas
+        product_x = (IMAGE_WIDTH - new_width) // 2
+        product_y = available_space_top + (available_height - new_height) // 2
+
+        # Paste product image
+        if product_img.mode == 'RGBA':
+            canvas.paste(product_img, (product_x, product_y), product_img)
+        else:
+            canvas.paste(product_img, (product_x, product_y))
 
     return canvas
 
 
-def main():
+def slide_filename(deal, index):
+    """Output filename for a deal's slide"""
+    brand = deal.brand.lower().replace(' ', '_')
+    short_id = deal.short_id or index
+    return output_filename(f"{brand}_{short_id}", 'individual')
+
+
+def slide_fingerprint(deal, product, font_path_medium, font_path_light):
+    """Fingerprint of everything a deal's slide is rendered from"""
+    return fingerprint(
+        deals=[{'brand': deal.brand, 'discount_percent': deal.discount_percent}],
+        sources=[product.data if product else None],
+        files=[__file__, LOGO_PATH, font_path_medium, font_path_light],
+    )
+
+
+def render_slide(deal, product_img, font_path_medium, font_path_light, filepath, encoder=None):
+    """Compose one deal's slide and save it, or queue it on an encoder's threads"""
+    with span('compose', 'slide', brand=deal.brand):
+        image = compose_tiktok_image(deal, product_img, font_path_medium, font_path_light)
+    if encoder is not None:
+        encoder.submit(image, filepath)
+    else:
+        save_output(image, filepath)
+    return filepath
+
+
+def get_render_workers(num_jobs):
+    """Number of render processes from config (0 = one per CPU core)"""
+    workers = config.RENDERING['workers']
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, num_jobs))
+
+
+def _init_render_worker(font_path_medium, font_path_light):
+    """Load fonts, logo and gradient once when a render worker starts"""
+    registry = get_font_registry()
+    registry.load(font_path_medium, BRAND_FONT_SIZE)
+    registry.load(font_path_light, DISCOUNT_FONT_SIZE)
+    try:
+        load_logo()
+    except Exception as e:
+        print(f"  Error loading logo: {e}")
+    create_gradient_background(IMAGE_WIDTH, IMAGE_HEIGHT)
+
+
+def _render_slide_job(job, collect_trace=False, encoder=None):
+    """
+    Render one slide; returns (filepath, error traceback or None, trace),
+    where trace holds a worker process's spans for the parent to merge
+    """
+    deal, product_img, font_path_medium, font_path_light, filepath = job
+    try:
+        render_slide(deal, product_img, font_path_medium, font_path_light, filepath, encoder)
+        error = None
+    except Exception:
+        import traceback
+        error = traceback.format_exc()
+    return filepath, error, get_tracer().take() if collect_trace else None
+
+
+def report_render_results(results, total):
+    """Print render results in deal order, merging worker traces; returns the saved paths"""
+    saved = []
+    for i, (filepath, error, trace) in enumerate(results, 1):
+        get_tracer().merge(trace)
+        if error is None:
+            print(f"  ✓ [{i}/{total}] Saved: {filepath}")
+            saved.append(filepath)
+        else:
+            print(f"  ✗ [{i}/{total}] Error processing deal: {filepath}")
+            print(error)
+    return saved
+
+
+def main(pipeline=None):
     """Main function to generate all TikTok images"""
     print("=" * 50)
     print("TikTok Image Asset Generator")
@@ -345,42 +255,88 @@ def main():
 
     # Create output directory with today's date
     today = datetime.now().strftime("%Y-%m-%d")
-    output_dir = os.path.join(OUTPUT_BASE_DIR, today)
+    output_dir = os.path.join(config.OUTPUT['base_dir'], today)
     os.makedirs(output_dir, exist_ok=True)
     print(f"Output directory: {output_dir}")
 
-    # Fetch deals
-    deals = fetch_deals()
+    # Fetch deals (once per run, shared through the pipeline)
+    if pipeline is None:
+        pipeline = DailyPipeline()
+    deals = pipeline.deals
     print(f"Found {len(deals)} deals")
 
     if not deals:
         print("No deals found. Exiting.")
         return
 
-    # Generate images for each deal
+    # Download every product image, then keep the slides whose inputs are unchanged
+    pipeline.download_all(collage_limit=0)
+    build = BuildManifest(output_dir)
+    store = get_render_store()
+    stale = []
     for i, deal in enumerate(deals, 1):
-        print(f"\n[{i}/{len(deals)}] Processing deal...")
-        try:
-            # Create image
-            image = create_tiktok_image(deal, font_path_medium, font_path_light)
-
-            # Save image
-            brand = deal.get('brand', 'unknown').lower().replace(' ', '_')
-            short_id = deal.get('short_id', i)
-            filename = f"{brand}_{short_id}.png"
-            filepath = os.path.join(output_dir, filename)
-
-            image.save(filepath, 'PNG')
-            print(f"  ✓ Saved: {filepath}")
-        except Exception as e:
-            print(f"  ✗ Error processing deal: {e}")
-            import traceback
-            traceback.print_exc()
+        filename = slide_filename(deal, i)
+        slide_fp = slide_fingerprint(deal, pipeline.product_assets(deal), font_path_medium, font_path_light)
+        if build.is_current(filename, slide_fp):
+            print(f"  Up to date: {filename}")
+        elif store is not None and store.fetch(slide_fp, os.path.join(output_dir, filename)):
+            # Same deal with identical inputs was rendered on an earlier day
+            print(f"  Reused earlier render: {filename}")
+            remove_stale_variants(os.path.join(output_dir, filename))
+            build.record(filename, slide_fp)
+        else:
+            stale.append((deal, filename, slide_fp))
+
+    if not stale:
+        build.save()
+        print(f"\nAll {len(deals)} slides are up to date in {output_dir}")
+        print("=" * 50)
+        return
+
+    # Cut out only the changed slides' product images (batched)
+    pipeline.prepare(collage_limit=0, product_deals=[deal for deal, _, _ in stale])
+
+    # Generate images for each changed deal
+    jobs = []
+    fingerprints = {}
+    for deal, filename, slide_fp in stale:
+        product = pipeline.product_assets(deal)
+        product_img = product.cutout if product else None
+        filepath = os.path.join(output_dir, filename)
+        fingerprints[filepath] = slide_fp
+        jobs.append((deal, product_img, font_path_medium, font_path_light, filepath))
+
+    workers = get_render_workers(len(jobs))
+    print(f"\nRendering {len(jobs)} slides with {workers} worker(s)...")
+
+    if workers > 1:
+        # spawn rather than fork: the parent may already be running ONNX Runtime threads
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_render_worker,
+                                 initargs=(font_path_medium, font_path_light)) as executor:
+            # map() yields in submission order, so logs and filenames stay deterministic
+            saved = report_render_results(executor.map(partial(_render_slide_job, collect_trace=True), jobs),
+                                          len(jobs))
+    else:
+        # Compose in this process while a thread pool encodes the finished slides
+        with OutputEncoder() as encoder:
+            results = list(map(partial(_render_slide_job, encoder=encoder), jobs))
+            errors = encoder.wait()
+        results = [(filepath, error or errors.get(filepath), trace) for filepath, error, trace in results]
+        saved = report_render_results(results, len(jobs))
+
+    for filepath in saved:
+        build.record(os.path.basename(filepath), fingerprints[filepath])
+        if store is not None:
+            store.put(fingerprints[filepath], filepath)
+    build.save()
 
     print(f"\n{'=' * 50}")
-    print(f"Complete! Generated {len(deals)} images in {output_dir}")
+    print(f"Complete! Generated {len(saved)} images in {output_dir} "
+          f"({len(deals) - len(jobs)} unchanged)")
     print("=" * 50)
 
 
 if __name__ == "__main__":
-    main()
+    run_main(main, 'generate_tiktok_images')
@@ -1,6 +1,61 @@
 """Reusable components library"""
 
-from .image_utils import *
-from .text_utils import *
-from .api_utils import *
-from .layout_engine import *
+import importlib
+import importlib.util
+
+# Modules whose public names are available as lib.<name>, later ones taking
+# precedence as with the star imports this replaces. They are imported on
+# first use, so scripts that only need lib.deals don't load the image stack
+# (rembg and ONNX Runtime)
+_EXPORTING_MODULES = ('image_utils', 'text_utils', 'api_utils', 'deals', 'layout_engine', 'pipeline')
+
+# Everything the star imports used to export, so `from lib import *` keeps
+# working; each name is still imported only when asked for
+__all__ = [
+    'DailyPipeline', 'Deal', 'LayoutEngine', 'ProductAssets', 'TextLayout',
+    'add_multiline_text', 'add_text_with_shadow', 'apply_filter', 'atomic_write',
+    'calculate_centered_position', 'calculate_discount_percentage', 'count',
+    'create_gradient_background', 'create_layout_strategy', 'decode_image',
+    'download_image', 'download_image_bytes', 'draw_text_layout', 'extract_deal_info',
+    'fetch_deals', 'fetch_payload', 'format_discount_text', 'get_asset_manager',
+    'get_background_remover', 'get_cutout_cache', 'get_downloader', 'get_font',
+    'get_font_registry', 'get_gradient_stops', 'get_recorder', 'get_replay',
+    'get_text_dimensions', 'interpolate_color', 'layout_text', 'limit_source_size',
+    'load_and_resize_asset', 'load_deals', 'measure_text', 'optimize_image',
+    'parse_deals', 'paste_with_transparency', 'remove_background', 'remove_backgrounds',
+    'resize_maintaining_aspect', 'resolve_prices', 'snapshot_path', 'span',
+    'structural_similarity', 'transform_text',
+    # Submodules
+    'api_utils', 'assets', 'background_removal', 'build_manifest', 'cache_utils',
+    'cutout_cache', 'deals', 'downloader', 'font_registry', 'image_utils',
+    'instrumentation', 'layout_engine', 'output_encoder', 'pipeline', 'replay',
+    'text_utils',
+    # Modules and names the library modules import themselves
+    'BytesIO', 'Image', 'ImageChops', 'ImageFilter', 'config', 'datetime', 'json',
+    'math', 'namedtuple', 'np', 'os', 'requests',
+]
+
+
+def __getattr__(name):
+    if name.startswith('_'):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # Submodules (from lib import replay) import just that module
+    if importlib.util.find_spec(f"{__name__}.{name}") is not None:
+        return importlib.import_module(f"{__name__}.{name}")
+
+    import_error = None
+    for module_name in reversed(_EXPORTING_MODULES):
+        try:
+            module = importlib.import_module(f"{__name__}.{module_name}")
+        except ImportError as e:
+            # e.g. image_utils without onnxruntime; other modules may still have the name
+            import_error = import_error or e
+            continue
+        if hasattr(module, name):
+            value = getattr(module, name)
+            globals()[name] = value
+            return value
+    if import_error is not None:
+        raise import_error
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,59 +2,31 @@
 API and data fetching utilities
 """
 
-import requests
 from config import creative_config as config
+from .deals import load_deals, calculate_discount_percentage
+
+# calculate_discount_percentage now lives in deals and is re-exported here
+# for scripts that import it from api_utils
+__all__ = ['fetch_deals', 'extract_deal_info', 'format_discount_text', 'calculate_discount_percentage']
 
 
 def fetch_deals(api_url=None, max_deals=None):
     """
-    Fetch deals from API
+    Fetch deals (from today's snapshot if one was already written)
 
     Args:
         api_url: Optional API URL override
         max_deals: Limit number of deals returned
 
     Returns:
-        List of deal dictionaries
-    """
-    if api_url is None:
-        api_url = config.API_URL
-
-    print(f"Fetching deals from {api_url}...")
-
-    try:
-        response = requests.get(api_url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        deals = data.get('deals', [])
-
-        if max_deals:
-            deals = deals[:max_deals]
-
-        print(f"  Found {len(deals)} deals")
-        return deals
-
-    except Exception as e:
-        print(f"Error fetching deals: {e}")
-        return []
-
-
-def calculate_discount_percentage(current_price, original_price):
+        List of Deal records
     """
-    Calculate discount percentage
+    deals = load_deals(api_url)
 
-    Args:
-        current_price: Discounted price
-        original_price: Original price
+    if max_deals:
+        deals = deals[:max_deals]
 
-    Returns:
-        Discount percentage (int)
-    """
-    if original_price == 0:
-        return 0
-
-    discount = (1 - (current_price / original_price)) * 100
-    return round(discount)
+    return deals
 
 
 def extract_deal_info(deal):
@@ -62,31 +34,13 @@ def extract_deal_info(deal):
     Extract relevant information from deal object
 
     Args:
-        deal: Deal dictionary from API
+        deal: Deal record
 
     Returns:
         Dictionary with extracted info
     """
-    # Get prices
-    current_price = deal.get('current_price', 0)
-    best_promo = deal.get('best_promo_code', {})
-
-    if best_promo and best_promo.get('price_after_applied'):
-        promo_price = best_promo.get('price_after_applied', 0)
-        if promo_price < current_price:
-            original_price = current_price
-            discount_price = promo_price
-        else:
-            original_price = current_price * 1.25
-            discount_price = current_price
-    else:
-        discount_price = current_price
-        original_price = current_price * 1.25
-
-    discount_percent = calculate_discount_percentage(discount_price, original_price)
-
     # Extract brand name and apply text transform
-    brand = deal.get('brand', 'Unknown')
+    brand = deal.brand
     transform = config.TEXT_TEMPLATES['individual'].get('text_transform', 'lowercase')
 
     if transform == 'lowercase':
@@ -98,12 +52,12 @@ def extract_deal_info(deal):
 
     return {
         'brand': brand,
-        'name': deal.get('name', ''),
-        'image_urls': deal.get('image_urls', []),
-        'short_id': deal.get('short_id', ''),
-        'discount_percent': discount_percent,
-        'current_price': current_price,
-        'original_price': original_price,
+        'name': deal.name,
+        'image_urls': list(deal.image_urls),
+        'short_id': deal.short_id,
+        'discount_percent': deal.discount_percent,
+        'current_price': deal.current_price,
+        'original_price': deal.original_price,
     }
 
 
@@ -0,0 +1,173 @@
+"""
+Asset manager
+Decodes each image asset (logo, sparkle, icons) once per process and
+keeps resized sprites in memory and in a persistent on-disk cache
+"""
+
+import hashlib
+import os
+import threading
+from io import BytesIO
+from PIL import Image
+from config import creative_config as config
+from .build_manifest import file_hash
+from .cache_utils import atomic_write, touch, evict_lru
+from .instrumentation import count
+
+
+class AssetManager:
+    """
+    Hands out resized sprites keyed by (asset, size, mode)
+
+    Sources are decoded at most once; each sprite is resized once and
+    persisted as a lossless PNG keyed on the source file's content hash,
+    so later runs and render workers skip decoding the full-size source.
+    Returned images are shared: paste them, don't draw on them.
+    """
+
+    def __init__(self, cache_dir=None, max_size_mb=None):
+        settings = config.CACHE['sprites']
+        if cache_dir is None and settings['enabled']:
+            cache_dir = os.path.join(config.CACHE['base_dir'], settings['dir'])
+        if max_size_mb is None:
+            max_size_mb = settings['max_size_mb']
+
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self._sources = {}
+        self._sizes = {}
+        self._sprites = {}
+        self._lock = threading.Lock()
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def source(self, path):
+        """
+        Full-size decoded asset
+
+        Args:
+            path: Asset file path
+
+        Returns:
+            PIL Image (shared)
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            if key not in self._sources:
+                image = Image.open(path)
+                image.load()
+                self._sources[key] = image
+                self._sizes[key] = image.size
+            return self._sources[key]
+
+    def source_size(self, path):
+        """
+        Size of an asset, read from the file header without decoding it
+
+        Args:
+            path: Asset file path
+
+        Returns:
+            Tuple (width, height)
+        """
+        key = os.path.abspath(path)
+        if key not in self._sizes:
+            with Image.open(path) as image:
+                self._sizes[key] = image.size
+        return self._sizes[key]
+
+    def fit_width(self, path, width):
+        """
+        Sprite size for an asset scaled to a width, keeping its aspect ratio
+
+        Args:
+            path: Asset file path
+            width: Target width
+
+        Returns:
+            Tuple (width, height)
+        """
+        source_width, source_height = self.source_size(path)
+        return width, int(source_height * (width / source_width))
+
+    def sprite(self, path, size, mode=None):
+        """
+        Asset resized with LANCZOS, optionally converted
+
+        Args:
+            path: Asset file path
+            size: Tuple (width, height) or single int for square
+            mode: Image mode to convert to after resizing (source mode if None)
+
+        Returns:
+            PIL Image (shared)
+        """
+        if isinstance(size, int):
+            size = (size, size)
+        key = (os.path.abspath(path), tuple(size), mode)
+
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            return sprite
+
+        disk_path = self._disk_path(path, size, mode)
+        sprite = self._load_cached(disk_path)
+        if sprite is None:
+            sprite = self.source(path).resize(size, Image.Resampling.LANCZOS)
+            if mode is not None and sprite.mode != mode:
+                sprite = sprite.convert(mode)
+            self._store_cached(disk_path, sprite)
+
+        with self._lock:
+            self._sprites[key] = sprite
+        return sprite
+
+    def _disk_path(self, path, size, mode):
+        if self.cache_dir is None:
+            return None
+        source_hash = file_hash(path)
+        if source_hash is None:
+            return None
+        key = hashlib.sha256(f"{source_hash}:{size[0]}x{size[1]}:{mode}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def _load_cached(self, disk_path):
+        if disk_path is None:
+            return None
+        try:
+            image = Image.open(disk_path)
+            image.load()
+        except (FileNotFoundError, OSError):
+            count('sprite.cache_misses')
+            return None
+        touch(disk_path)
+        count('sprite.cache_hits')
+        return image
+
+    def _store_cached(self, disk_path, sprite):
+        if disk_path is None:
+            return
+        try:
+            buffer = BytesIO()
+            sprite.save(buffer, 'PNG')
+            atomic_write(disk_path, buffer.getvalue())
+        except Exception as e:
+            print(f"  Error writing sprite cache entry: {e}")
+            return
+        evict_lru(self.cache_dir, self.max_bytes)
+
+
+_asset_manager = None
+
+
+def get_asset_manager():
+    """
+    Get the shared asset manager for this process
+
+    Returns:
+        AssetManager
+    """
+    global _asset_manager
+    if _asset_manager is None:
+        _asset_manager = AssetManager()
+    return _asset_manager
@@ -0,0 +1,223 @@
+"""
+Background removal service
+Holds one rembg session for the whole run, configured from BACKGROUND_REMOVAL
+"""
+
+import numpy as np
+import onnxruntime as ort
+from PIL import Image
+from rembg import remove, new_session
+from config import creative_config as config
+
+
+# Input normalization per model: (mean, std, input size)
+# Matches rembg's own preprocessing so batched masks equal single-image masks
+MODEL_NORMALIZATION = {
+    'u2net': ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    'u2netp': ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    'u2net_human_seg': ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    'silueta': ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    'isnet-general-use': ((0.5, 0.5, 0.5), (1.0, 1.0, 1.0), (1024, 1024)),
+    'isnet-anime': ((0.5, 0.5, 0.5), (1.0, 1.0, 1.0), (1024, 1024)),
+}
+
+
+def limit_source_size(image, max_edge):
+    """
+    Downscale an image so its longest edge is at most max_edge
+
+    Product images are shown at most ~1000 px wide, so decoding, model
+    preprocessing and mask application on the full download only pays
+    for pixels that get thrown away.
+
+    Args:
+        image: PIL Image
+        max_edge: Longest edge in pixels, 0 or None for no limit
+
+    Returns:
+        PIL Image (the input if it already fits)
+    """
+    if not max_edge or max(image.size) <= max_edge:
+        return image
+    if image.mode in ('1', 'P'):
+        # Palette images would otherwise resize with nearest neighbour
+        image = image.convert('RGBA')
+    scale = max_edge / max(image.size)
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.Resampling.BICUBIC, reducing_gap=2.0)
+
+
+class BackgroundRemover:
+    """
+    Wraps a single rembg session so the ONNX model is loaded once
+    and every cutout reuses it
+    """
+
+    def __init__(self, model=None, intra_op_threads=None, inter_op_threads=None, providers=None):
+        settings = config.BACKGROUND_REMOVAL
+        self.model = model or settings['model']
+        self.intra_op_threads = settings['intra_op_threads'] if intra_op_threads is None else intra_op_threads
+        self.inter_op_threads = settings['inter_op_threads'] if inter_op_threads is None else inter_op_threads
+        self.providers = providers or settings['providers']
+        self.batch_size = settings.get('batch_size', 1)
+        self.max_source_edge = settings.get('max_source_edge', 0)
+        self.restore_full_resolution = settings.get('restore_full_resolution', False)
+        self._session = None
+        self._batch_supported = True
+
+    @property
+    def session(self):
+        """rembg session, created on first use"""
+        if self._session is None:
+            print(f"  Loading background removal model: {self.model}")
+            self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        sess_opts = ort.SessionOptions()
+        if self.intra_op_threads:
+            sess_opts.intra_op_num_threads = self.intra_op_threads
+        if self.inter_op_threads:
+            sess_opts.inter_op_num_threads = self.inter_op_threads
+
+        # new_session() only exposes threads through OMP_NUM_THREADS, so build
+        # the session class directly when we need our own SessionOptions
+        try:
+            from rembg.sessions import sessions_class
+        except ImportError:
+            return new_session(self.model, providers=self.providers)
+
+        for session_class in sessions_class:
+            if session_class.name() == self.model:
+                return session_class(self.model, sess_opts, providers=self.providers)
+
+        return new_session(self.model, providers=self.providers)
+
+    def settings(self):
+        """
+        Settings that affect the cutout, used in cache keys
+
+        Returns:
+            Dict of settings
+        """
+        return {
+            'model': self.model,
+            'max_source_edge': self.max_source_edge,
+            'restore_full_resolution': self.restore_full_resolution,
+        }
+
+    def downscale(self, image):
+        """
+        Cap an image's longest edge at max_source_edge before inference
+
+        Args:
+            image: PIL Image
+
+        Returns:
+            PIL Image (the input if it already fits)
+        """
+        return limit_source_size(image, self.max_source_edge)
+
+    def remove(self, image):
+        """
+        Remove the background from a PIL image
+
+        Args:
+            image: PIL Image
+
+        Returns:
+            RGBA PIL Image, at the capped size unless restore_full_resolution is set
+        """
+        source = self.downscale(image)
+        cutout = remove(source, session=self.session)
+        if self.restore_full_resolution and source is not image:
+            # Upscale the mask and cut out the full-size original
+            return self._apply_mask(image, cutout.getchannel('A'))
+        return cutout
+
+    def remove_batch(self, images, batch_size=None):
+        """
+        Remove backgrounds from many images with batched ONNX inference
+
+        Images are capped at max_source_edge, resized to the model input
+        size and stacked into one NCHW tensor per batch. The predicted masks
+        are applied back at the capped size (or the original resolution with
+        restore_full_resolution). Models without known preprocessing fall
+        back to one remove() call per image.
+
+        Args:
+            images: List of PIL Images
+            batch_size: Images per inference call (config default if None)
+
+        Returns:
+            List of RGBA PIL Images in input order
+        """
+        if self.model not in MODEL_NORMALIZATION:
+            return [self.remove(image) for image in images]
+
+        if batch_size is None:
+            batch_size = self.batch_size
+        batch_size = max(1, batch_size)
+
+        results = []
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            sources = [self.downscale(image) for image in chunk]
+            masks = self._predict_masks(sources)
+            targets = chunk if self.restore_full_resolution else sources
+            for image, mask in zip(targets, masks):
+                results.append(self._apply_mask(image, mask))
+        return results
+
+    def _normalize(self, image):
+        mean, std, size = MODEL_NORMALIZATION[self.model]
+        im = image.convert('RGB').resize(size, Image.Resampling.LANCZOS)
+        ary = np.asarray(im, dtype=np.float32)
+        ary = ary / max(float(ary.max()), 1e-6)
+        ary = (ary - np.array(mean, dtype=np.float32)) / np.array(std, dtype=np.float32)
+        return ary.transpose((2, 0, 1))
+
+    def _predict_masks(self, images):
+        inner = self.session.inner_session
+        input_name = inner.get_inputs()[0].name
+        tensors = [self._normalize(image) for image in images]
+
+        if self._batch_supported and len(tensors) > 1:
+            try:
+                preds = inner.run(None, {input_name: np.stack(tensors)})[0][:, 0, :, :]
+            except Exception as e:
+                # Some exported models have a fixed batch dimension of 1
+                print(f"  Batched inference unavailable ({e}), running per image")
+                self._batch_supported = False
+
+        if not self._batch_supported or len(tensors) == 1:
+            preds = [inner.run(None, {input_name: tensor[np.newaxis]})[0][0, 0, :, :]
+                     for tensor in tensors]
+
+        masks = []
+        for pred in preds:
+            lo, hi = float(np.min(pred)), float(np.max(pred))
+            pred = (pred - lo) / max(hi - lo, 1e-6)
+            masks.append(Image.fromarray((pred * 255).astype(np.uint8)))
+        return masks
+
+    def _apply_mask(self, image, mask):
+        mask = mask.resize(image.size, Image.Resampling.LANCZOS)
+        empty = Image.new('RGBA', image.size, 0)
+        return Image.composite(image.convert('RGBA'), empty, mask)
+
+
+_background_remover = None
+
+
+def get_background_remover():
+    """
+    Get the shared background remover for this run
+
+    Returns:
+        BackgroundRemover
+    """
+    global _background_remover
+    if _background_remover is None:
+        _background_remover = BackgroundRemover()
+    return _background_remover
@@ -0,0 +1,192 @@
+"""
+Incremental builds
+Each output folder keeps a manifest of the input fingerprint every file
+was rendered from, so a rerun only re-renders what actually changed
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from config import creative_config as config
+from .cache_utils import atomic_write
+from .output_formats import encoder_settings
+
+
+MANIFEST_VERSION = 1
+
+# Library modules whose code changes the bytes of a rendered file: drawing,
+# cutouts, placement, sprite resizing, font resolution and encoding
+RENDER_MODULES = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ('image_utils.py', 'text_utils.py', 'background_removal.py', 'collage.py',
+                 'layout_engine.py', 'assets.py', 'font_registry.py', 'output_encoder.py',
+                 'output_formats.py')
+]
+
+# File hashes per (path, size, mtime), computed once per process
+_file_hashes = {}
+
+
+def file_hash(path):
+    """
+    Hash a file's contents
+
+    Args:
+        path: File path
+
+    Returns:
+        Hex digest, or None if the file cannot be read
+    """
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_hashes:
+        digest = hashlib.sha256()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        _file_hashes[key] = digest.hexdigest()
+    return _file_hashes[key]
+
+
+def data_hash(data):
+    """
+    Hash in-memory bytes (e.g. a downloaded source image)
+
+    Args:
+        data: Bytes or None
+
+    Returns:
+        Hex digest or None
+    """
+    if data is None:
+        return None
+    return hashlib.sha256(data).hexdigest()
+
+
+def render_settings():
+    """
+    Config values that change how every page renders
+
+    Returns:
+        Dict of settings
+    """
+    background_removal = None
+    if config.FEATURES['background_removal']:
+        background_removal = config.BACKGROUND_REMOVAL['model']
+    return {
+        'color_scheme': config.COLOR_SCHEMES.get(config.ACTIVE_COLOR_SCHEME),
+        'background_removal': background_removal,
+        'max_source_edge': config.BACKGROUND_REMOVAL['max_source_edge'],
+        'restore_full_resolution': config.BACKGROUND_REMOVAL['restore_full_resolution'],
+        'encoding': encoder_settings(),
+        'optimization': config.OPTIMIZATION if config.FEATURES['auto_optimize_images'] else None,
+    }
+
+
+def fingerprint(deals=(), sources=(), files=(), settings=None):
+    """
+    Fingerprint everything an output file is rendered from
+
+    Args:
+        deals: Dicts of the deal fields the renderer draws
+        sources: Source image bytes (None for a missing image)
+        files: Paths of code, fonts and image assets used by the renderer
+        settings: Extra renderer-specific settings
+
+    Returns:
+        Hex digest
+    """
+    inputs = {
+        'deals': list(deals),
+        'sources': [data_hash(data) for data in sources],
+        'files': [file_hash(path) for path in list(files) + RENDER_MODULES],
+        'config': render_settings(),
+        'settings': settings,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def manifest_path(output_dir):
+    """
+    Manifest file for an output folder, named after its day plus a hash of
+    its location (so a replay's <bundle>/out/<day> keeps its own manifest)
+
+    Args:
+        output_dir: Day output folder
+
+    Returns:
+        File path
+    """
+    location = hashlib.sha256(os.path.abspath(output_dir).encode('utf-8')).hexdigest()[:12]
+    name = f"{os.path.basename(os.path.normpath(output_dir))}-{location}.json"
+    return os.path.join(config.CACHE['base_dir'], config.BUILD['dir'], name)
+
+
+class BuildManifest:
+    """
+    Records which input fingerprint produced each file in an output folder
+
+    Kept under the gitignored cache directory, one file per day folder, so the
+    committed day folders hold only the images.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.path = manifest_path(output_dir)
+        self.outputs = {}
+        try:
+            with open(self.path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                self.outputs = manifest.get('outputs', {})
+        except (OSError, ValueError):
+            pass
+
+    def is_current(self, filename, fingerprint):
+        """
+        Check whether a file was built from these inputs and still exists
+
+        Args:
+            filename: Output filename inside the folder
+            fingerprint: Fingerprint of the current inputs
+
+        Returns:
+            True if the file can be kept as is
+        """
+        if not config.BUILD['incremental']:
+            return False
+        entry = self.outputs.get(filename)
+        return (entry is not None and entry.get('fingerprint') == fingerprint
+                and os.path.exists(os.path.join(self.output_dir, filename)))
+
+    def record(self, filename, fingerprint):
+        """
+        Record the inputs a file was just built from
+
+        Args:
+            filename: Output filename inside the folder
+            fingerprint: Fingerprint of its inputs
+        """
+        self.outputs[filename] = {
+            'fingerprint': fingerprint,
+            'built_at': datetime.now().isoformat(timespec='seconds'),
+        }
+
+    def save(self):
+        """Write the manifest"""
+        manifest = {'version': MANIFEST_VERSION, 'outputs': dict(sorted(self.outputs.items()))}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            atomic_write(self.path, json.dumps(manifest, indent=2).encode('utf-8'))
+        except OSError as e:
+            print(f"  Error writing build manifest: {e}")
@@ -0,0 +1,75 @@
+"""
+Shared helpers for the on-disk caches
+"""
+
+import os
+import tempfile
+
+
+def atomic_write(path, data):
+    """
+    Write bytes to a file atomically (temp file + rename)
+
+    Args:
+        path: Destination path
+        data: Bytes to write
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp creates files readable only by the owner
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def touch(path):
+    """Mark a cache file as recently used"""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def evict_lru(cache_dir, max_bytes):
+    """
+    Remove least recently used files until the directory fits its size cap
+
+    Recency is tracked through file modification times, which cache
+    lookups refresh with touch().
+
+    Args:
+        cache_dir: Cache directory
+        max_bytes: Size cap in bytes
+    """
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if name.endswith('.tmp'):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    if total <= max_bytes:
+        return
+
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= max_bytes:
+            break
@@ -0,0 +1,159 @@
+"""
+Collage placement engine
+Scales and rotates product cutouts onto the collage pages with one
+integer-factor reduce() and a single affine transform per product
+"""
+
+import math
+from PIL import Image
+from .layout_engine import LayoutEngine
+
+
+def fit_size(image, max_size):
+    """
+    Size of an image scaled so its longer side is max_size
+
+    Args:
+        image: PIL Image
+        max_size: Target length of the longer side
+
+    Returns:
+        Tuple (width, height)
+    """
+    aspect_ratio = image.width / image.height
+    if aspect_ratio > 1:
+        # Wider than tall
+        return max_size, int(max_size / aspect_ratio)
+    # Taller than wide
+    return int(max_size * aspect_ratio), max_size
+
+
+def reduce_for_size(image, size):
+    """
+    Shrink an image by the largest integer factor that keeps it at
+    least as large as the target size
+
+    Box-reducing first keeps the following transform within a 2x
+    downscale, where bicubic sampling doesn't alias.
+
+    Args:
+        image: PIL Image
+        size: Target (width, height)
+
+    Returns:
+        PIL Image (the input if no reduction applies)
+    """
+    factor = min(image.width // max(size[0], 1), image.height // max(size[1], 1))
+    if factor < 2:
+        return image
+    return image.reduce(factor)
+
+
+def scale_rotate_transform(source_size, size, rotation):
+    """
+    Affine transform that scales to `size` and rotates by `rotation`
+    degrees counter-clockwise, expanding to fit the rotated image
+    (the same geometry as resize() followed by rotate(expand=True))
+
+    Args:
+        source_size: (width, height) of the image being transformed
+        size: (width, height) after scaling, before rotation
+        rotation: Angle in degrees
+
+    Returns:
+        Tuple (output size, affine data for Image.transform)
+    """
+    width, height = size
+    angle = -math.radians(rotation)
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+
+    # Output -> scaled-image mapping, rotating about the center
+    def apply(x, y, matrix):
+        a, b, c, d, e, f = matrix
+        return a * x + b * y + c, d * x + e * y + f
+
+    center_x, center_y = width / 2.0, height / 2.0
+    matrix = [cos_a, sin_a, 0.0, -sin_a, cos_a, 0.0]
+    matrix[2], matrix[5] = apply(-center_x, -center_y, matrix)
+    matrix[2] += center_x
+    matrix[5] += center_y
+
+    corners = [apply(x, y, matrix) for x, y in ((0, 0), (width, 0), (width, height), (0, height))]
+    xs = [x for x, _ in corners]
+    ys = [y for _, y in corners]
+    out_width = math.ceil(max(xs)) - math.floor(min(xs))
+    out_height = math.ceil(max(ys)) - math.floor(min(ys))
+    matrix[2], matrix[5] = apply(-(out_width - width) / 2.0, -(out_height - height) / 2.0, matrix)
+
+    # Scaled-image -> source mapping folded into the same matrix
+    scale_x = source_size[0] / width
+    scale_y = source_size[1] / height
+    a, b, c, d, e, f = matrix
+    return (out_width, out_height), (a * scale_x, b * scale_x, c * scale_x,
+                                     d * scale_y, e * scale_y, f * scale_y)
+
+
+def render_product(product_img, max_size, rotation):
+    """
+    Scale a product to max_size (longer side) and rotate it
+
+    Args:
+        product_img: PIL Image (RGBA cutout or plain image)
+        max_size: Target length of the longer side
+        rotation: Angle in degrees, counter-clockwise
+
+    Returns:
+        PIL Image sized to the rotated bounding box
+    """
+    if product_img.mode not in ('RGB', 'RGBA'):
+        product_img = product_img.convert('RGBA')
+    size = fit_size(product_img, max_size)
+    if rotation % 360 == 0:
+        # Nothing to rotate: a plain resize, box-reduced first for large sources
+        return product_img.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    # Work premultiplied so transparent pixels don't bleed into the edges
+    source = product_img.convert('RGBa') if product_img.mode == 'RGBA' else product_img
+    source = reduce_for_size(source, size)
+
+    out_size, data = scale_rotate_transform(source.size, size, rotation)
+    placed = source.transform(out_size, Image.Transform.AFFINE, data,
+                              resample=Image.Resampling.BICUBIC)
+    return placed.convert('RGBA') if placed.mode == 'RGBa' else placed
+
+
+def place_product(canvas, product_img, center, max_size, rotation):
+    """
+    Paste a scaled, rotated product centered on a point
+
+    Args:
+        canvas: PIL Image to paste onto
+        product_img: PIL Image
+        center: (x, y) center of the product on the canvas
+        max_size: Target length of the longer side
+        rotation: Angle in degrees, counter-clockwise
+    """
+    placed = render_product(product_img, max_size, rotation)
+    x = center[0] - placed.width // 2
+    y = center[1] - placed.height // 2
+    if placed.mode == 'RGBA':
+        canvas.paste(placed, (x, y), placed)
+    else:
+        canvas.paste(placed, (x, y))
+
+
+def arrange_products_collage(canvas, product_images, start_y, available_height, position_style=None):
+    """
+    Arrange products in the configured collage style (PRODUCT_POSITIONS)
+
+    Args:
+        canvas: PIL Image to paste onto
+        product_images: List of PIL Images, extras beyond the layout are skipped
+        start_y: Top of the product area
+        available_height: Height of the product area
+        position_style: Key in PRODUCT_POSITIONS (ACTIVE_PRODUCT_POSITION if None)
+    """
+    engine = LayoutEngine(canvas.width, canvas.height)
+    positions = engine.get_product_positions(available_height, position_style)
+    for product_img, (x, y, size, rotation) in zip(product_images, positions):
+        place_product(canvas, product_img, (x, start_y + y), size, rotation)
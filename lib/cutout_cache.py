@@ -0,0 +1,121 @@
+"""
+Persistent content-addressed cache for background-removal results
+"""
+
+import hashlib
+import json
+import os
+from io import BytesIO
+from PIL import Image
+from config import creative_config as config
+from .cache_utils import atomic_write, touch, evict_lru
+from .instrumentation import count
+
+
+class CutoutCache:
+    """
+    On-disk cache of RGBA cutouts keyed by a hash of the source image
+    bytes plus the removal settings, with a size cap and LRU eviction
+    """
+
+    def __init__(self, cache_dir=None, max_size_mb=None, image_format=None):
+        settings = config.CACHE['cutouts']
+        if cache_dir is None:
+            cache_dir = os.path.join(config.CACHE['base_dir'], settings['dir'])
+        if max_size_mb is None:
+            max_size_mb = settings['max_size_mb']
+        if image_format is None:
+            image_format = settings['format']
+
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.image_format = image_format.lower()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, source_bytes, settings):
+        """
+        Build a cache key from source bytes and removal settings
+
+        Args:
+            source_bytes: Encoded (or raw pixel) bytes of the source image
+            settings: Dict of model name and options that affect the output
+
+        Returns:
+            Hex digest string
+        """
+        digest = hashlib.sha256()
+        digest.update(source_bytes)
+        digest.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.{self.image_format}")
+
+    def get(self, key):
+        """
+        Look up a cutout
+
+        Args:
+            key: Cache key from make_key()
+
+        Returns:
+            RGBA PIL Image or None on miss
+        """
+        path = self._path(key)
+        try:
+            image = Image.open(path)
+            image.load()
+        except (FileNotFoundError, OSError):
+            self.misses += 1
+            count('cutout.cache_misses')
+            return None
+
+        # Touch the file so eviction sees it as recently used
+        touch(path)
+        self.hits += 1
+        count('cutout.cache_hits')
+        return image
+
+    def put(self, key, image):
+        """
+        Store a cutout and evict old entries if over the size cap
+
+        Args:
+            key: Cache key from make_key()
+            image: PIL Image to store
+        """
+        path = self._path(key)
+        save_args = {'lossless': True} if self.image_format == 'webp' else {}
+        try:
+            buffer = BytesIO()
+            image.convert('RGBA').save(buffer, self.image_format.upper(), **save_args)
+            atomic_write(path, buffer.getvalue())
+        except Exception as e:
+            print(f"  Error writing cutout cache entry: {e}")
+            return
+
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits its size cap"""
+        evict_lru(self.cache_dir, self.max_bytes)
+
+
+_cutout_cache = None
+
+
+def get_cutout_cache():
+    """
+    Get the shared cutout cache
+
+    Returns:
+        CutoutCache or None if disabled in config
+    """
+    global _cutout_cache
+    if not config.CACHE['cutouts']['enabled']:
+        return None
+    if _cutout_cache is None:
+        _cutout_cache = CutoutCache()
+    return _cutout_cache
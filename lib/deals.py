@@ -0,0 +1,268 @@
+"""
+Deal ingest
+Fetches the deal list once per day, validates it, snapshots the raw
+response in the cache directory and returns compact deal records
+"""
+
+import json
+import os
+from datetime import datetime
+import requests
+from config import creative_config as config
+from .cache_utils import atomic_write
+from .instrumentation import span, count
+from .replay import get_recorder, get_replay
+
+
+class Deal:
+    """
+    One validated deal with prices and discount resolved up front
+    """
+
+    __slots__ = ('brand', 'name', 'short_id', 'current_price', 'original_price',
+                 'discount_price', 'discount_percent', 'image_urls')
+
+    def __init__(self, brand, name='', short_id='', current_price=0.0, original_price=0.0,
+                 discount_price=0.0, discount_percent=0, image_urls=()):
+        self.brand = brand
+        self.name = name
+        self.short_id = short_id
+        self.current_price = current_price
+        self.original_price = original_price
+        self.discount_price = discount_price
+        self.discount_percent = discount_percent
+        self.image_urls = tuple(image_urls)
+
+    def __repr__(self):
+        return f"Deal({self.brand!r}, short_id={self.short_id!r}, discount_percent={self.discount_percent})"
+
+    @classmethod
+    def from_api(cls, item):
+        """
+        Build a deal from one API item
+
+        Args:
+            item: Deal dictionary from the API
+
+        Returns:
+            Deal
+
+        Raises:
+            ValueError: If a required field is missing or has the wrong type
+        """
+        if not isinstance(item, dict):
+            raise ValueError("deal is not an object")
+
+        brand = item.get('brand')
+        if not isinstance(brand, str) or not brand.strip():
+            raise ValueError("missing brand")
+
+        current_price = item.get('current_price') or 0
+        if not isinstance(current_price, (int, float)) or current_price < 0:
+            raise ValueError(f"invalid current_price {current_price!r}")
+
+        image_urls = item.get('image_urls') or []
+        if not isinstance(image_urls, list):
+            raise ValueError("image_urls is not a list")
+        image_urls = [url for url in image_urls if isinstance(url, str) and url]
+
+        original_price, discount_price = resolve_prices(current_price, item.get('best_promo_code'))
+
+        return cls(
+            brand=brand.strip(),
+            name=str(item.get('name') or ''),
+            short_id=str(item.get('short_id') or ''),
+            current_price=current_price,
+            original_price=original_price,
+            discount_price=discount_price,
+            discount_percent=calculate_discount_percentage(discount_price, original_price),
+            image_urls=image_urls,
+        )
+
+
+def calculate_discount_percentage(current_price, original_price):
+    """
+    Calculate discount percentage
+
+    Args:
+        current_price: Discounted price
+        original_price: Original price
+
+    Returns:
+        Discount percentage (int)
+    """
+    if original_price == 0:
+        return 0
+
+    discount = (1 - (current_price / original_price)) * 100
+    return round(discount)
+
+
+def resolve_prices(current_price, best_promo):
+    """
+    Work out the original and discounted price of a deal
+
+    The API's current_price may be either side of the promo price, so the
+    lower one is taken as the discounted price. Without a usable promo the
+    original price is estimated at 25% above the current price.
+
+    Args:
+        current_price: current_price from the API
+        best_promo: best_promo_code object from the API (may be None)
+
+    Returns:
+        Tuple (original_price, discount_price)
+    """
+    promo_price = best_promo.get('price_after_applied') if isinstance(best_promo, dict) else None
+    if isinstance(promo_price, (int, float)) and promo_price:
+        if promo_price < current_price:
+            return current_price, promo_price
+    return current_price * 1.25, current_price
+
+
+def parse_deals(payload):
+    """
+    Validate an API response and build deal records
+
+    Invalid deals are skipped with a warning rather than failing the run.
+
+    Args:
+        payload: Decoded JSON response
+
+    Returns:
+        List of Deal
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get('deals'), list):
+        print("Error: deals response has no 'deals' list")
+        return []
+
+    deals = []
+    for i, item in enumerate(payload['deals']):
+        try:
+            deals.append(Deal.from_api(item))
+        except ValueError as e:
+            print(f"  Skipping deal {i}: {e}")
+    return deals
+
+
+def snapshot_path(day=None):
+    """
+    Path of a day's deals snapshot, under the gitignored cache directory
+    so the daily commit of generated_images/ doesn't pick it up
+
+    Args:
+        day: Date string in OUTPUT['date_format'] (today if None)
+
+    Returns:
+        File path
+    """
+    if day is None:
+        day = datetime.now().strftime(config.OUTPUT['date_format'])
+    return os.path.join(config.CACHE['base_dir'], config.CACHE['deals']['dir'], f"{day}.json")
+
+
+def fetch_payload(api_url=None):
+    """
+    Download the raw deals response
+
+    Args:
+        api_url: Optional API URL override
+
+    Returns:
+        Response body bytes or None if failed
+    """
+    replay = get_replay()
+    if replay is not None:
+        if not replay.serving:
+            print(f"Loading deals from replay bundle {replay.path}")
+            return replay.deals_body()
+        api_url = replay.api_url()
+
+    if api_url is None:
+        api_url = config.API_URL
+
+    print(f"Fetching deals from {api_url}...")
+    try:
+        response = requests.get(api_url, timeout=config.DOWNLOADS['timeout'])
+        response.raise_for_status()
+        return response.content
+    except Exception as e:
+        print(f"Error fetching deals: {e}")
+        return None
+
+
+def load_deals(api_url=None, refresh=False, path=None):
+    """
+    Get the day's deals, reading the snapshot if one exists
+
+    The first call of the day fetches the API and, if the response holds
+    at least one valid deal, writes it to the snapshot; every later stage
+    and rerun reads it from disk. A snapshot without valid deals is
+    ignored and fetched again.
+
+    Args:
+        api_url: Optional API URL override
+        refresh: Fetch from the API even if a snapshot exists
+        path: Snapshot path override (today's snapshot if None)
+
+    Returns:
+        List of Deal
+    """
+    if path is None:
+        path = snapshot_path()
+
+    # A replayed run always takes its deals from the bundle, and leaves the
+    # live snapshot alone
+    replaying = get_replay() is not None
+    if replaying:
+        refresh = True
+
+    if not refresh and os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+            deals = parse_deals(json.loads(body))
+            if deals:
+                print(f"Loading deals from snapshot {path}")
+                count('deals.snapshot_hits')
+                _record(body, api_url)
+                print(f"  Found {len(deals)} deals")
+                return deals
+            print("  Deals snapshot has no valid deals, fetching again")
+        except (OSError, ValueError) as e:
+            print(f"  Error reading deals snapshot, fetching again: {e}")
+
+    with span('fetch', 'fetch deals'):
+        body = fetch_payload(api_url)
+    if body is None:
+        return []
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        print(f"Error decoding deals: {e}")
+        return []
+    count('deals.bytes', len(body))
+
+    deals = parse_deals(payload)
+    print(f"  Found {len(deals)} deals")
+    if not deals:
+        # Not snapshotted, so the next stage or rerun asks the API again
+        return []
+
+    # Snapshot the raw response so later stages and reruns skip the API
+    if not replaying:
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            atomic_write(path, body)
+        except OSError as e:
+            print(f"  Error writing deals snapshot: {e}")
+
+    _record(body, api_url)
+    return deals
+
+
+def _record(body, api_url):
+    """Add the deals response to the replay bundle being recorded, if any"""
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.record_deals(body, api_url or config.API_URL)
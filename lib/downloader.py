@@ -0,0 +1,257 @@
+"""
+Product image downloader
+Pooled HTTP session with retries, parallel fetching and a revalidating disk cache
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import creative_config as config
+from .cache_utils import atomic_write, touch, evict_lru
+from .instrumentation import span, count
+from .replay import get_recorder, get_replay
+
+
+class HttpCache:
+    """
+    On-disk HTTP response cache revalidated with ETag / Last-Modified
+    """
+
+    def __init__(self, cache_dir=None, max_size_mb=None):
+        settings = config.CACHE['http']
+        if cache_dir is None:
+            cache_dir = os.path.join(config.CACHE['base_dir'], settings['dir'])
+        if max_size_mb is None:
+            max_size_mb = settings['max_size_mb']
+
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.json", f"{base}.body"
+
+    def lookup(self, url):
+        """
+        Find a cached response
+
+        Args:
+            url: Request URL
+
+        Returns:
+            Tuple (body, metadata dict), or (None, None) on miss
+        """
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+
+        if meta.get('url') != url:
+            return None, None
+
+        touch(meta_path)
+        touch(body_path)
+        return body, meta
+
+    def validators(self, meta):
+        """
+        Build conditional request headers from cached metadata
+
+        Args:
+            meta: Metadata dict from lookup()
+
+        Returns:
+            Dict of headers
+        """
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def store(self, url, body, headers):
+        """
+        Cache a response if it carries a validator
+
+        Args:
+            url: Request URL
+            body: Response body bytes
+            headers: Response headers
+        """
+        meta = {
+            'url': url,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+        }
+        if not meta['etag'] and not meta['last_modified']:
+            return
+
+        meta_path, body_path = self._paths(url)
+        try:
+            atomic_write(body_path, body)
+            atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+        except Exception as e:
+            print(f"  Error writing HTTP cache entry: {e}")
+            return
+
+        evict_lru(self.cache_dir, self.max_bytes)
+
+
+class Downloader:
+    """
+    Fetches product images over a pooled requests.Session with per-host
+    connection limits, backoff retries and the HTTP disk cache
+    """
+
+    def __init__(self, max_workers=None, per_host_connections=None, retries=None,
+                 backoff_factor=None, timeout=None, cache=None):
+        settings = config.DOWNLOADS
+        self.max_workers = max_workers or settings['max_workers']
+        self.timeout = timeout or settings['timeout']
+        per_host_connections = per_host_connections or settings['per_host_connections']
+        retries = settings['retries'] if retries is None else retries
+        backoff_factor = settings['backoff_factor'] if backoff_factor is None else backoff_factor
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=('GET', 'HEAD'),
+        )
+        # pool_block makes pool_maxsize a hard per-host connection limit
+        adapter = HTTPAdapter(
+            pool_connections=self.max_workers,
+            pool_maxsize=per_host_connections,
+            pool_block=True,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        if cache is None and config.CACHE['http']['enabled']:
+            cache = HttpCache()
+        self.cache = cache
+
+        self.cache_hits = 0
+        self.bytes_downloaded = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, url, timeout=None):
+        """
+        Download a URL, revalidating against the disk cache
+
+        Args:
+            url: Image URL
+            timeout: Request timeout in seconds (config default if None)
+
+        Returns:
+            Response body bytes or None if failed
+        """
+        replay = get_replay()
+        if replay is not None and not replay.serving:
+            body = replay.image(url)
+            if body is None:
+                print(f"Error downloading image from {url}: not in replay bundle")
+                return None
+            with self._lock:
+                self.bytes_downloaded += len(body)
+            count('download.bytes', len(body))
+            return body
+
+        with span('download', url=url):
+            body = self._fetch(url, timeout, replay)
+
+        recorder = get_recorder()
+        if recorder is not None and body is not None:
+            recorder.record_image(url, body)
+        return body
+
+    def _fetch(self, url, timeout=None, replay=None):
+        if timeout is None:
+            timeout = self.timeout
+
+        # Replay runs go to the local stand-in and bypass the HTTP cache
+        request_url = url
+        cache = self.cache
+        if replay is not None:
+            request_url = replay.url_for(url)
+            cache = None
+
+        cached_body, meta = (None, None)
+        headers = {}
+        if cache is not None:
+            cached_body, meta = cache.lookup(url)
+            if meta is not None:
+                headers = cache.validators(meta)
+
+        try:
+            response = self.session.get(request_url, headers=headers, timeout=timeout)
+            if response.status_code == 304 and cached_body is not None:
+                with self._lock:
+                    self.cache_hits += 1
+                count('download.cache_hits')
+                return cached_body
+
+            response.raise_for_status()
+            body = response.content
+        except Exception as e:
+            if cached_body is not None:
+                print(f"Error downloading image from {url}: {e} (using cached copy)")
+                return cached_body
+            print(f"Error downloading image from {url}: {e}")
+            return None
+
+        with self._lock:
+            self.bytes_downloaded += len(body)
+        count('download.bytes', len(body))
+        if cache is not None:
+            cache.store(url, body, response.headers)
+        return body
+
+    def fetch_all(self, urls):
+        """
+        Download many URLs in parallel
+
+        Args:
+            urls: Iterable of URLs (duplicates are fetched once)
+
+        Returns:
+            Dict mapping URL to bytes (None for failures)
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return {}
+
+        workers = min(self.max_workers, len(unique_urls))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            bodies = list(executor.map(self.fetch, unique_urls))
+        return dict(zip(unique_urls, bodies))
+
+
+_downloader = None
+
+
+def get_downloader():
+    """
+    Get the shared downloader for this run
+
+    Returns:
+        Downloader
+    """
+    global _downloader
+    if _downloader is None:
+        _downloader = Downloader()
+    return _downloader
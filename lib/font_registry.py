@@ -0,0 +1,148 @@
+"""
+Font registry
+Resolves font paths once per run and keeps one font object per (face, size)
+"""
+
+import os
+from PIL import ImageFont
+from config import creative_config as config
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FontRegistry:
+    """
+    Caches resolved font paths per weight / font type and loaded
+    FreeType faces per (path, size)
+    """
+
+    def __init__(self):
+        self._paths = {}
+        self._fonts = {}
+
+    def _first_existing(self, candidates):
+        for path in candidates:
+            if not path:
+                continue
+            if not os.path.isabs(path):
+                path = os.path.join(PROJECT_ROOT, path)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _fallback(self, weight):
+        """Try FONT_FALLBACKS for a weight whose candidates are all missing"""
+        for fallback in config.FONT_FALLBACKS.get(weight, []):
+            if fallback in config.FONT_CANDIDATES:
+                print(f"Warning: SF Pro Rounded {weight} not found, trying {fallback}")
+                path = self._first_existing(config.FONT_CANDIDATES[fallback])
+            else:
+                path = self._first_existing([fallback])
+                if path:
+                    print(f"Warning: SF Pro Rounded {weight} not found, using bundled {os.path.basename(path)}")
+            if path:
+                return path
+        print(f"Warning: Font {weight} not found, using default font")
+        return None
+
+    def resolve(self, weight='regular', candidates=None):
+        """
+        Find the font file for a weight, checking disk only once
+
+        Args:
+            weight: 'medium', 'light' or 'regular'
+            candidates: Optional extra paths to try first
+
+        Returns:
+            Font path, or None if not even the bundled fallback exists
+        """
+        key = (weight, tuple(candidates or ()))
+        if key not in self._paths:
+            system_paths = list(candidates or ()) + config.FONT_CANDIDATES.get(weight, [])
+            path = self._first_existing(system_paths)
+            if path is None:
+                path = self._fallback(weight)
+            self._paths[key] = path
+        return self._paths[key]
+
+    def resolve_type(self, font_type='brand'):
+        """
+        Find the font file for a FONTS config entry
+
+        Args:
+            font_type: 'brand', 'discount', or 'title'
+
+        Returns:
+            Font path or None
+        """
+        font_config = config.FONTS.get(font_type, config.FONTS['brand'])
+        return self.resolve(font_config['weight'], font_config['paths'])
+
+    def load(self, path, size):
+        """
+        Get a font object for a path and size, loading it once
+
+        Args:
+            path: Font file path, or None for Pillow's default font
+            size: Font size in pixels
+
+        Returns:
+            ImageFont
+        """
+        key = (path, size)
+        if key not in self._fonts:
+            font = None
+            if path:
+                try:
+                    font = ImageFont.truetype(path, size)
+                except OSError as e:
+                    print(f"Warning: Could not load font {path}: {e}")
+            if font is None:
+                font = ImageFont.load_default(size)
+            self._fonts[key] = font
+        return self._fonts[key]
+
+    def get(self, font_type='brand', size=None):
+        """
+        Get the font for a FONTS config entry
+
+        Args:
+            font_type: 'brand', 'discount', or 'title'
+            size: Optional size override (config size if None)
+
+        Returns:
+            ImageFont
+        """
+        if size is None:
+            size = config.FONTS.get(font_type, config.FONTS['brand'])['size']
+        return self.load(self.resolve_type(font_type), size)
+
+    def get_weight(self, weight, size):
+        """
+        Get a font by weight and size
+
+        Args:
+            weight: 'medium', 'light' or 'regular'
+            size: Font size in pixels
+
+        Returns:
+            ImageFont
+        """
+        return self.load(self.resolve(weight), size)
+
+
+_font_registry = None
+
+
+def get_font_registry():
+    """
+    Get the shared font registry for this process
+
+    Returns:
+        FontRegistry
+    """
+    global _font_registry
+    if _font_registry is None:
+        _font_registry = FontRegistry()
+    return _font_registry
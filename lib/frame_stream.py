@@ -0,0 +1,117 @@
+"""
+Frame stream helpers for animations
+Overlap frame rendering with encoding and sample previews without
+holding the whole animation in memory
+"""
+
+import queue
+import threading
+from PIL import Image
+
+
+_DONE = object()
+
+
+def prefetch(frames, depth=2):
+    """
+    Produce items from an iterator on a background thread
+
+    At most `depth` items are buffered, so memory stays bounded while
+    the next frame renders during the current frame's encode.
+
+    Args:
+        frames: Iterable of frames (or any items)
+        depth: Maximum number of buffered items
+
+    Yields:
+        Items from `frames` in order
+    """
+    buffer = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+
+    def put(item):
+        # Give up as soon as the consumer has gone away
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in frames:
+                if not put(item):
+                    return
+            put(_DONE)
+        except Exception as e:
+            put(e)
+
+    producer = threading.Thread(target=produce, name='frame-producer', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Let the producer exit if the consumer stopped early
+        stop.set()
+        producer.join()
+
+
+class FrameSampler:
+    """
+    Keeps small thumbnails of evenly spaced frames as they stream past,
+    for a preview contact sheet
+    """
+
+    def __init__(self, total_frames, count=6, thumb_width=270):
+        self.count = min(count, total_frames)
+        self.thumb_width = thumb_width
+        step = total_frames / self.count if self.count else 0
+        self.indices = {int(i * step) for i in range(self.count)}
+        self.thumbnails = []
+
+    def offer(self, frame_num, frame):
+        """
+        Keep a thumbnail if this frame is one of the sampled ones
+
+        Args:
+            frame_num: Frame index
+            frame: PIL Image
+        """
+        if frame_num not in self.indices:
+            return
+        thumb_height = round(frame.height * self.thumb_width / frame.width)
+        self.thumbnails.append(frame.resize((self.thumb_width, thumb_height), Image.Resampling.BILINEAR))
+
+    def contact_sheet(self, columns=3, padding=10, background='white'):
+        """
+        Lay the sampled thumbnails out in a grid
+
+        Args:
+            columns: Thumbnails per row
+            padding: Gap between thumbnails in pixels
+            background: Sheet background color
+
+        Returns:
+            RGB PIL Image, or None if nothing was sampled
+        """
+        if not self.thumbnails:
+            return None
+
+        columns = min(columns, len(self.thumbnails))
+        rows = -(-len(self.thumbnails) // columns)
+        thumb_w, thumb_h = self.thumbnails[0].size
+        sheet = Image.new('RGB', (columns * (thumb_w + padding) + padding,
+                                  rows * (thumb_h + padding) + padding), background)
+        for i, thumb in enumerate(self.thumbnails):
+            x = padding + (i % columns) * (thumb_w + padding)
+            y = padding + (i // columns) * (thumb_h + padding)
+            sheet.paste(thumb, (x, y))
+        return sheet
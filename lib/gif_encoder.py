@@ -0,0 +1,157 @@
+"""
+Palette-aware GIF encoder
+Quantizes every frame against one global palette and streams only the
+pixels that changed since the previous frame
+"""
+
+import time
+import numpy as np
+from PIL import Image, GifImagePlugin
+
+
+# Palette index reserved for "unchanged since the previous frame"
+TRANSPARENT_INDEX = 255
+
+
+def build_global_palette(images, colors=TRANSPARENT_INDEX):
+    """
+    Compute one palette covering every image that can appear in the animation
+
+    Args:
+        images: List of PIL Images (e.g. static layer plus icon sprites)
+        colors: Number of colors to quantize to (index 255 is kept free
+                for transparency)
+
+    Returns:
+        1x1 P-mode PIL Image carrying a 256 entry palette, for quantize()
+    """
+    width = max(image.width for image in images)
+    height = sum(image.height for image in images)
+    sheet = Image.new('RGB', (width, height))
+    y = 0
+    for image in images:
+        sheet.paste(image.convert('RGB'), (0, y))
+        y += image.height
+
+    palette = sheet.quantize(colors=colors, method=Image.Quantize.MEDIANCUT).getpalette()
+    palette = palette[:colors * 3]
+    # Pad unused entries with the first color so nothing maps to them
+    # except as a tie with index 0
+    palette += palette[:3] * (256 - len(palette) // 3)
+
+    palette_image = Image.new('P', (1, 1))
+    palette_image.putpalette(palette)
+    return palette_image
+
+
+class GifWriter:
+    """
+    Streams frames to a GIF file as they are produced
+
+    Every frame is quantized (without dithering) against the shared
+    palette. After the first frame only the bounding box of changed
+    pixels is written, with unchanged pixels inside it set to the
+    transparent index and disposal "do not dispose", so the previous
+    frame shows through.
+    """
+
+    def __init__(self, path, palette, duration=100, loop=0):
+        self.path = path
+        self.palette = palette
+        self.duration = duration
+        self.loop = loop
+        self.frames_written = 0
+        self.bytes_written = 0
+        self.encode_seconds = 0.0
+        self._fp = None
+        self._indices = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _quantize(self, image):
+        indices = np.asarray(image.convert('RGB').quantize(palette=self.palette, dither=Image.Dither.NONE))
+        # Padding entries duplicate index 0, so this never changes a color
+        return np.where(indices == TRANSPARENT_INDEX, 0, indices).astype(np.uint8)
+
+    def _write(self, chunks):
+        for chunk in chunks:
+            self._fp.write(chunk)
+            self.bytes_written += len(chunk)
+
+    def _frame_image(self, indices):
+        height, width = indices.shape
+        return Image.frombytes('P', (width, height), np.ascontiguousarray(indices).tobytes())
+
+    def add_frame(self, frame, dirty_rects=None):
+        """
+        Encode and write one frame
+
+        Args:
+            frame: RGB PIL Image at the full canvas size
+            dirty_rects: Optional list of (left, top, right, bottom) boxes
+                         outside of which the frame equals the previous one
+        """
+        start = time.perf_counter()
+
+        if self._indices is None:
+            self._write_first_frame(frame)
+        else:
+            self._write_delta_frame(frame, dirty_rects)
+
+        self.frames_written += 1
+        self.encode_seconds += time.perf_counter() - start
+
+    def _write_first_frame(self, frame):
+        self._indices = self._quantize(frame)
+        image = self._frame_image(self._indices)
+        image.putpalette(self.palette.getpalette())
+
+        self._fp = open(self.path, 'wb')
+        header, _ = GifImagePlugin.getheader(image, info={'loop': self.loop})
+        self._write(header)
+        self._write(GifImagePlugin.getdata(image, (0, 0), duration=self.duration, disposal=1,
+                                           transparency=TRANSPARENT_INDEX))
+
+    def _write_delta_frame(self, frame, dirty_rects):
+        height, width = self._indices.shape
+        if dirty_rects is None:
+            dirty_rects = [(0, 0, width, height)]
+
+        # Only the dirty region needs quantizing and comparing
+        box = None
+        if dirty_rects:
+            box = (min(r[0] for r in dirty_rects), min(r[1] for r in dirty_rects),
+                   max(r[2] for r in dirty_rects), max(r[3] for r in dirty_rects))
+
+        changed = None
+        if box is not None:
+            left, top, right, bottom = box
+            indices = self._quantize(frame.crop(box))
+            previous = self._indices[top:bottom, left:right]
+            changed = indices != previous
+
+        if changed is None or not changed.any():
+            # Nothing moved: a single transparent pixel keeps the frame timing
+            delta = np.full((1, 1), TRANSPARENT_INDEX, dtype=np.uint8)
+            offset = (0, 0)
+        else:
+            rows = np.flatnonzero(changed.any(axis=1))
+            cols = np.flatnonzero(changed.any(axis=0))
+            r0, r1, c0, c1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+            delta = np.where(changed, indices, TRANSPARENT_INDEX)[r0:r1, c0:c1]
+            offset = (left + int(c0), top + int(r0))
+            previous[changed] = indices[changed]
+
+        self._write(GifImagePlugin.getdata(self._frame_image(delta), offset, duration=self.duration,
+                                           disposal=1, transparency=TRANSPARENT_INDEX))
+
+    def close(self):
+        """Write the trailer and close the file"""
+        if self._fp is not None:
+            self._write([b';'])
+            self._fp.close()
+            self._fp = None
@@ -2,87 +2,272 @@
 Reusable image manipulation utilities
 """
 
-from PIL import Image, ImageDraw, ImageFilter
+import math
+import numpy as np
+from PIL import Image, ImageChops, ImageFilter
 from io import BytesIO
-from rembg import remove as remove_bg
-import requests
 from config import creative_config as config
+from .background_removal import get_background_remover, limit_source_size
+from .cutout_cache import get_cutout_cache
+from .downloader import get_downloader
+from .instrumentation import span
+from .assets import get_asset_manager
+
+
+# Finished gradients per (scheme, size), handed out as copies
+_gradient_cache = {}
+
+
+def get_gradient_stops(scheme):
+    """
+    Get the sorted color stops of a color scheme
+
+    Args:
+        scheme: Color scheme dict
+
+    Returns:
+        List of (position, (r, g, b)) tuples, positions from 0.0 to 1.0
+    """
+    stops = scheme.get('gradient_stops')
+    if not stops:
+        stops = [(0.0, scheme['gradient_start']), (1.0, scheme['gradient_end'])]
+    return sorted((float(pos), tuple(color)) for pos, color in stops)
+
+
+def interpolate_color(stops, ratio):
+    """
+    Interpolate a color between gradient stops
+
+    Args:
+        stops: List from get_gradient_stops()
+        ratio: Position from 0.0 to 1.0
+
+    Returns:
+        (r, g, b) tuple
+    """
+    if ratio <= stops[0][0]:
+        return stops[0][1]
+
+    for (pos_a, color_a), (pos_b, color_b) in zip(stops, stops[1:]):
+        if ratio <= pos_b:
+            gap = pos_b - pos_a
+            t = (ratio - pos_a) / gap if gap else 0.0
+            return tuple(int(a + (b - a) * t) for a, b in zip(color_a, color_b))
+
+    return stops[-1][1]
+
+
+def _render_gradient(width, height, stops, direction):
+    if direction == 'diagonal':
+        # Blend a vertical and a horizontal ramp into a 0-255 position map,
+        # then color it through per-channel lookup tables
+        vertical = Image.new('L', (1, height))
+        vertical.putdata([255 * y // max(height - 1, 1) for y in range(height)])
+        horizontal = Image.new('L', (width, 1))
+        horizontal.putdata([255 * x // max(width - 1, 1) for x in range(width)])
+        position = ImageChops.add(
+            vertical.resize((width, height), Image.Resampling.NEAREST),
+            horizontal.resize((width, height), Image.Resampling.NEAREST),
+            scale=2.0,
+        )
+        lut = [interpolate_color(stops, i / 255) for i in range(256)]
+        bands = [position.point([color[c] for color in lut]) for c in range(3)]
+        return Image.merge('RGB', bands)
+
+    # Linear gradients: compute one 1-pixel strip and stretch it
+    if direction == 'horizontal':
+        strip = Image.new('RGB', (width, 1))
+        strip.putdata([interpolate_color(stops, x / width) for x in range(width)])
+    else:
+        strip = Image.new('RGB', (1, height))
+        strip.putdata([interpolate_color(stops, y / height) for y in range(height)])
+    return strip.resize((width, height), Image.Resampling.NEAREST)
 
 
 def create_gradient_background(width, height, color_scheme=None):
     """
     Create a gradient background
 
+    Supports 'vertical' (default), 'horizontal' and 'diagonal' directions
+    and multi-stop gradients via the scheme's 'gradient_direction' and
+    'gradient_stops' keys. Each (scheme, size) is rendered once per run.
+
     Args:
         width: Image width
         height: Image height
         color_scheme: Optional color scheme name, uses active scheme if None
 
     Returns:
-        PIL Image with gradient
+        PIL Image with gradient (a fresh copy, safe to draw on)
     """
     if color_scheme is None:
         color_scheme = config.ACTIVE_COLOR_SCHEME
 
     scheme = config.COLOR_SCHEMES[color_scheme]
-    img = Image.new('RGB', (width, height), '#FFFFFF')
-    draw = ImageDraw.Draw(img)
+    stops = get_gradient_stops(scheme)
+    direction = scheme.get('gradient_direction', 'vertical')
+
+    key = (color_scheme, width, height, direction, tuple(stops))
+    if key not in _gradient_cache:
+        _gradient_cache[key] = _render_gradient(width, height, stops, direction)
+
+    return _gradient_cache[key].copy()
+
+
+def download_image_bytes(url, timeout=None):
+    """
+    Download raw image bytes from URL
+
+    Args:
+        url: Image URL
+        timeout: Request timeout in seconds (DOWNLOADS['timeout'] if None)
 
-    color_start = scheme['gradient_start']
-    color_end = scheme['gradient_end']
+    Returns:
+        Response body bytes or None if failed
+    """
+    return get_downloader().fetch(url, timeout=timeout)
 
-    for y in range(height):
-        ratio = y / height
-        r = int(color_start[0] + (color_end[0] - color_start[0]) * ratio)
-        g = int(color_start[1] + (color_end[1] - color_start[1]) * ratio)
-        b = int(color_start[2] + (color_end[2] - color_start[2]) * ratio)
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
 
-    return img
+def decode_image(data, max_edge=None):
+    """
+    Decode image bytes into a PIL Image
+
+    Args:
+        data: Encoded image bytes
+        max_edge: Optional longest edge needed; JPEGs are then decoded at
+            the smallest DCT scale (1/2, 1/4, 1/8) that still covers it
+
+    Returns:
+        PIL Image or None if failed
+    """
+    try:
+        image = Image.open(BytesIO(data))
+        if max_edge and max(image.size) > max_edge:
+            scale = max_edge / max(image.size)
+            image.draft(image.mode, (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+        image.load()
+        return image
+    except Exception as e:
+        print(f"Error decoding image: {e}")
+        return None
 
 
-def download_image(url, timeout=10):
+def download_image(url, timeout=None):
     """
     Download image from URL
 
     Args:
         url: Image URL
-        timeout: Request timeout in seconds
+        timeout: Request timeout in seconds (DOWNLOADS['timeout'] if None)
 
     Returns:
         PIL Image or None if failed
     """
+    data = download_image_bytes(url, timeout=timeout)
+    if data is None:
+        return None
+    return decode_image(data)
+
+
+def _cut_out(remover, image):
+    """Run one image through the remover; None if it fails"""
     try:
-        response = requests.get(url, timeout=timeout)
-        response.raise_for_status()
-        return Image.open(BytesIO(response.content))
+        with span('cutout'):
+            return remover.remove(image)
     except Exception as e:
-        print(f"Error downloading image from {url}: {e}")
+        print(f"Error removing background: {e}")
         return None
 
 
-def remove_background(image):
+def remove_background(image, source_bytes=None):
     """
-    Remove background from image
+    Remove background from image, reusing cached cutouts when available
 
     Args:
         image: PIL Image
+        source_bytes: Optional encoded bytes the image was decoded from,
+            used as the cache key (falls back to raw pixel data)
 
     Returns:
         PIL Image with background removed
     """
     if not config.FEATURES['background_removal']:
+        return limit_source_size(image, config.BACKGROUND_REMOVAL['max_source_edge'])
+
+    remover = get_background_remover()
+    cache = get_cutout_cache()
+    key = None
+    if cache is not None:
+        if source_bytes is None:
+            source_bytes = f"{image.mode}{image.size}".encode('utf-8') + image.tobytes()
+        key = cache.make_key(source_bytes, remover.settings())
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    result = _cut_out(remover, image)
+    if result is None:
         return image
 
-    try:
-        img_byte_arr = BytesIO()
-        image.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
-        output = remove_bg(img_byte_arr.read())
-        return Image.open(BytesIO(output))
-    except Exception as e:
-        print(f"Error removing background: {e}")
-        return image
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+def remove_backgrounds(images, source_bytes=None):
+    """
+    Remove backgrounds from a batch of images in one pass
+
+    Cached cutouts are reused; the remaining images go through batched
+    inference together instead of one model call each.
+
+    Args:
+        images: List of PIL Images
+        source_bytes: Optional list of encoded bytes, one per image
+
+    Returns:
+        List of PIL Images with background removed, in input order
+    """
+    if not config.FEATURES['background_removal']:
+        return [limit_source_size(image, config.BACKGROUND_REMOVAL['max_source_edge']) for image in images]
+
+    if source_bytes is None:
+        source_bytes = [None] * len(images)
+
+    remover = get_background_remover()
+    cache = get_cutout_cache()
+    results = [None] * len(images)
+    keys = [None] * len(images)
+    pending = []
+
+    for i, (image, data) in enumerate(zip(images, source_bytes)):
+        if cache is not None:
+            if data is None:
+                data = f"{image.mode}{image.size}".encode('utf-8') + image.tobytes()
+            keys[i] = cache.make_key(data, remover.settings())
+            results[i] = cache.get(keys[i])
+        if results[i] is None:
+            pending.append(i)
+
+    if pending:
+        print(f"  Removing backgrounds from {len(pending)} images...")
+        try:
+            with span('cutout', 'cutout batch', images=len(pending)):
+                cutouts = remover.remove_batch([images[i] for i in pending])
+        except Exception as e:
+            print(f"Error removing backgrounds in batch: {e}")
+            # One image at a time; the cache was already checked above
+            cutouts = [_cut_out(remover, images[i]) for i in pending]
+
+        for i, cutout in zip(pending, cutouts):
+            if cutout is None:
+                results[i] = images[i]
+                continue
+            results[i] = cutout
+            if cache is not None:
+                cache.put(keys[i], cutout)
+
+    return results
 
 
 def load_and_resize_asset(asset_key, size=None):
@@ -98,14 +283,12 @@ def load_and_resize_asset(asset_key, size=None):
     """
     try:
         asset_path = config.ASSETS[asset_key]
-        img = Image.open(asset_path)
+        assets = get_asset_manager()
 
+        # Copies, since the manager's decoded images are shared
         if size:
-            if isinstance(size, int):
-                size = (size, size)
-            img = img.resize(size, Image.Resampling.LANCZOS)
-
-        return img
+            return assets.sprite(asset_path, size).copy()
+        return assets.source(asset_path).copy()
     except Exception as e:
         print(f"Error loading asset {asset_key}: {e}")
         return None
@@ -187,16 +370,79 @@ def apply_filter(image, filter_type):
 
 def optimize_image(image):
     """
-    Optimize image size and quality
+    Prepare a finished page for the smallest encoding without changing
+    how it looks: flatten fully opaque RGBA to RGB, switch to an exact
+    palette when the page has at most 256 colors, and drop metadata
 
     Args:
         image: PIL Image
 
     Returns:
-        Optimized PIL Image
+        Optimized PIL Image (the input if nothing applies)
     """
     if not config.FEATURES['auto_optimize_images']:
         return image
 
-    # Placeholder for optimization logic
+    if image.mode in ('RGBA', 'LA') and image.getchannel('A').getextrema() == (255, 255):
+        image = image.convert('RGB' if image.mode == 'RGBA' else 'L')
+
+    if image.mode == 'RGB':
+        colors = image.getcolors(256)
+        if colors is not None:
+            # Few enough colors for a lossless palette
+            palette = Image.new('P', (1, 1))
+            palette.putpalette([channel for _, color in colors for channel in color])
+            image = image.quantize(palette=palette, dither=Image.Dither.NONE)
+
+    if image.info:
+        # Don't carry ICC profiles, EXIF or text chunks into the output
+        image = image.copy()
+        image.info = {}
     return image
+
+
+def _window_sums(values, size):
+    """Sum of every size x size window, from an integral image"""
+    integral = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=np.float64)
+    np.cumsum(values, axis=0, out=integral[1:, 1:])
+    np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+    return (integral[size:, size:] - integral[:-size, size:]
+            - integral[size:, :-size] + integral[:-size, :-size])
+
+
+def _channel_ssim(x, y, window):
+    """Mean SSIM between two single-channel float arrays"""
+    area = float(window * window)
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+
+    mu_x = _window_sums(x, window) / area
+    mu_y = _window_sums(y, window) / area
+    var_x = _window_sums(x * x, window) / area - mu_x * mu_x
+    var_y = _window_sums(y * y, window) / area - mu_y * mu_y
+    cov = _window_sums(x * y, window) / area - mu_x * mu_y
+    ssim_map = ((2 * mu_x * mu_y + c1) * (2 * cov + c2)) / \
+               ((mu_x * mu_x + mu_y * mu_y + c1) * (var_x + var_y + c2))
+    return float(ssim_map.mean())
+
+
+def structural_similarity(reference, candidate, window=7):
+    """
+    SSIM between two images of the same size, with a uniform sliding
+    window, taken per R, G and B channel (and alpha if both have one)
+
+    The lowest channel score is returned, so an encoding that shifts hue
+    but keeps brightness still fails.
+
+    Args:
+        reference: PIL Image as rendered
+        candidate: PIL Image after lossy encoding
+        window: Window size in pixels
+
+    Returns:
+        Float, 1.0 for identical images
+    """
+    mode = 'RGBA' if 'A' in reference.getbands() and 'A' in candidate.getbands() else 'RGB'
+    x = np.asarray(reference.convert(mode), dtype=np.float64)
+    y = np.asarray(candidate.convert(mode), dtype=np.float64)
+    return min(_channel_ssim(x[..., c], y[..., c], window) for c in range(x.shape[2]))
@@ -0,0 +1,238 @@
+"""
+Run instrumentation
+Lightweight spans and counters for the daily run, written out as a
+Chrome trace (open in chrome://tracing or https://ui.perfetto.dev)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from config import creative_config as config
+from .cache_utils import atomic_write
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+
+class Tracer:
+    """
+    Collects timed spans and counters from every thread of a process
+    """
+
+    def __init__(self):
+        self.events = []
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def enabled(self):
+        return config.TRACING['enabled']
+
+    @contextmanager
+    def span(self, stage, name=None, **args):
+        """
+        Time a block of work
+
+        Args:
+            stage: Stage category ('fetch', 'download', 'cutout', 'compose',
+                   'encode', 'save' or 'step')
+            name: Event name shown in the trace (the stage if None)
+            **args: Extra details stored on the event
+        """
+        if not self.enabled():
+            yield
+            return
+
+        start_wall = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            rss = _peak_rss_mb()
+            if rss is not None:
+                args['peak_rss_mb'] = rss
+            event = {
+                'name': name or stage,
+                'cat': stage,
+                'ph': 'X',
+                'ts': int(start_wall * 1e6),
+                'dur': int(duration * 1e6),
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': args,
+            }
+            with self._lock:
+                self.events.append(event)
+
+    def count(self, name, value=1):
+        """
+        Add to a counter
+
+        Args:
+            name: Counter name, e.g. 'download.bytes'
+            value: Amount to add
+        """
+        if not self.enabled():
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def take(self):
+        """
+        Remove and return everything recorded so far, so a worker
+        process can hand its events back to the parent
+
+        Returns:
+            Dict with 'events' and 'counters'
+        """
+        with self._lock:
+            recorded = {'events': self.events, 'counters': self.counters}
+            self.events = []
+            self.counters = {}
+        return recorded
+
+    def merge(self, recorded):
+        """
+        Add events and counters recorded in another process
+
+        Args:
+            recorded: Dict returned by take()
+        """
+        if not recorded:
+            return
+        with self._lock:
+            self.events.extend(recorded['events'])
+            for name, value in recorded['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        """
+        Total time per stage
+
+        Returns:
+            List of (stage, calls, total seconds, longest seconds), slowest first
+        """
+        stages = {}
+        for event in self.events:
+            calls, total, longest = stages.get(event['cat'], (0, 0, 0))
+            stages[event['cat']] = (calls + 1, total + event['dur'], max(longest, event['dur']))
+        rows = [(stage, calls, total / 1e6, longest / 1e6)
+                for stage, (calls, total, longest) in stages.items()]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def write(self, path):
+        """
+        Write a Chrome trace file
+
+        Args:
+            path: Output file path
+        """
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event['ts'])
+            counters = dict(sorted(self.counters.items()))
+
+        trace_events = []
+        for pid in sorted({event['pid'] for event in events}):
+            label = 'main' if pid == os.getpid() else f"worker {pid}"
+            trace_events.append({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                                 'args': {'name': label}})
+        trace_events.extend(events)
+        if events and counters:
+            end = max(event['ts'] + event['dur'] for event in events)
+            trace_events.append({'name': 'counters', 'ph': 'C', 'ts': end,
+                                 'pid': os.getpid(), 'args': counters})
+
+        trace = {
+            'traceEvents': trace_events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'counters': counters},
+        }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        atomic_write(path, json.dumps(trace).encode('utf-8'))
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    """
+    Get the tracer for this process
+
+    Returns:
+        Tracer
+    """
+    return _tracer
+
+
+def span(stage, name=None, **args):
+    """Time a block of work on the process tracer (see Tracer.span)"""
+    return _tracer.span(stage, name, **args)
+
+
+def count(name, value=1):
+    """Add to a counter on the process tracer"""
+    _tracer.count(name, value)
+
+
+def trace_path(day=None):
+    """
+    Path for this run's trace file, under the gitignored cache directory
+    so the daily commit of generated_images/ doesn't pick it up
+
+    Args:
+        day: Date string in OUTPUT['date_format'] (today if None)
+
+    Returns:
+        File path
+    """
+    now = datetime.now()
+    if day is None:
+        day = now.strftime(config.OUTPUT['date_format'])
+    return os.path.join(config.CACHE['base_dir'], config.TRACING['dir'], day,
+                        f"run-{now.strftime('%H%M%S')}.json")
+
+
+def write_trace(path=None):
+    """
+    Write this run's trace and print a per-stage summary
+
+    Args:
+        path: Output file path (trace_path() if None)
+
+    Returns:
+        Path written, or None if tracing is off or nothing was recorded
+    """
+    if not config.TRACING['enabled'] or not _tracer.events:
+        return None
+    if path is None:
+        path = trace_path()
+
+    print("Stage timings:")
+    for stage, calls, total, longest in _tracer.summary():
+        print(f"  {stage:<10} {calls:>4} calls {total:>8.2f}s total {longest:>7.2f}s longest")
+    for name, value in sorted(_tracer.counters.items()):
+        print(f"  {name:<24} {value}")
+
+    try:
+        _tracer.write(path)
+    except OSError as e:
+        print(f"Error writing trace: {e}")
+        return None
+    print(f"Trace: {path}")
+    return path
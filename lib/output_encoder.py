@@ -0,0 +1,264 @@
+"""
+Output encoder
+Encodes finished pages in the format OUTPUT['formats'] selects for each
+asset type (PNG, WebP, AVIF or progressive JPEG), with the options in
+ENCODING, on a thread pool
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from PIL import Image
+from config import creative_config as config
+from .cache_utils import atomic_write
+from .image_utils import optimize_image, structural_similarity
+from .instrumentation import span, count
+from .output_formats import IMAGE_FORMATS, FORMAT_ALIASES, IMAGE_EXTENSIONS, format_for_path
+
+
+def _prepare(image, fmt, settings):
+    """Convert an image into a mode the format can encode"""
+    if fmt == 'jpeg':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # No alpha in JPEG: flatten onto white
+            rgba = image.convert('RGBA')
+            flat = Image.new('RGB', rgba.size, 'white')
+            flat.paste(rgba, mask=rgba.getchannel('A'))
+            return flat
+        return image if image.mode in ('RGB', 'L') else image.convert('RGB')
+
+    if image.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    if fmt == 'png' and settings.get('quantize') and image.mode in ('RGB', 'RGBA'):
+        # Fast octree is the only quantizer Pillow supports for RGBA
+        method = Image.Quantize.FASTOCTREE if image.mode == 'RGBA' else Image.Quantize.MEDIANCUT
+        dither = Image.Dither.FLOYDSTEINBERG if settings.get('dither', True) else Image.Dither.NONE
+        image = image.quantize(colors=settings.get('colors', 256), method=method, dither=dither)
+    return image
+
+
+def _save_args(fmt, settings):
+    """Pillow save() keyword arguments for a format"""
+    if fmt == 'png':
+        return {'compress_level': settings.get('compress_level', 6),
+                'optimize': settings.get('optimize', False)}
+    if fmt == 'webp':
+        return {'quality': settings.get('quality', 90), 'method': settings.get('method', 4),
+                'lossless': settings.get('lossless', False)}
+    if fmt == 'avif':
+        return {'quality': settings.get('quality', 75), 'speed': settings.get('speed', 6)}
+    return {'quality': settings.get('quality', 90), 'progressive': settings.get('progressive', True),
+            'optimize': settings.get('optimize', True), 'subsampling': settings.get('subsampling', '4:2:0')}
+
+
+def encode_image(image, fmt='png', settings=None):
+    """
+    Encode an image with the configured options for a format
+
+    Args:
+        image: PIL Image
+        fmt: Format name from IMAGE_FORMATS
+        settings: Encoder options (ENCODING[fmt] if None)
+
+    Returns:
+        Encoded bytes
+    """
+    fmt = FORMAT_ALIASES.get(fmt, fmt)
+    if settings is None:
+        settings = config.ENCODING.get(fmt, {})
+    buffer = BytesIO()
+    _prepare(image, fmt, settings).save(buffer, IMAGE_FORMATS[fmt][0], **_save_args(fmt, settings))
+    return buffer.getvalue()
+
+
+def _lowest_passing(steps, attempt):
+    """
+    Binary search steps (ordered from highest to lowest quality) for the
+    lowest one whose encoding passes; attempt(step) returns bytes or None
+
+    Returns:
+        Tuple (step, bytes) or None if no step passes
+    """
+    best = None
+    low, high = 0, len(steps) - 1
+    while low <= high:
+        middle = (low + high) // 2
+        data = attempt(steps[middle])
+        if data is not None:
+            best = (steps[middle], data)
+            low = middle + 1
+        else:
+            high = middle - 1
+    return best
+
+
+def encode_optimized(image, fmt='png'):
+    """
+    Encode an image as small as possible while it stays within
+    OPTIMIZATION['min_ssim'] of the rendered page
+
+    The page goes through optimize_image() first. Then lower WebP/AVIF/JPEG
+    qualities, or smaller PNG palettes, are tried in a binary search, and
+    the smallest passing encoding is kept. The encoding with the
+    configured options is the fallback.
+
+    Args:
+        image: PIL Image
+        fmt: Format name from IMAGE_FORMATS
+
+    Returns:
+        Tuple (encoded bytes, description of the chosen encoding)
+    """
+    fmt = FORMAT_ALIASES.get(fmt, fmt)
+    options = config.OPTIMIZATION
+    base = config.ENCODING.get(fmt, {})
+    image = optimize_image(image)
+    best = (encode_image(image, fmt, base), 'as configured')
+    scores = {}
+
+    def attempt(settings):
+        data = encode_image(image, fmt, settings)
+        if len(data) >= len(best[0]):
+            return None
+        decoded = Image.open(BytesIO(data))
+        score = structural_similarity(image, decoded)
+        scores[len(data)] = score
+        return data if score >= options['min_ssim'] else None
+
+    if fmt == 'png':
+        if image.mode in ('RGB', 'RGBA'):
+            steps = sorted(options['palette_colors'], reverse=True)
+            found = _lowest_passing(steps, lambda colors: attempt(dict(base, quantize=True, colors=colors)))
+            if found is not None:
+                best = (found[1], f"{found[0]} colors")
+    else:
+        steps = sorted((q for q in options['quality_steps'] if q < base.get('quality', 100)), reverse=True)
+        found = _lowest_passing(steps, lambda quality: attempt(dict(base, quality=quality)))
+        if found is not None:
+            best = (found[1], f"quality {found[0]}")
+
+    data, description = best
+    if len(data) in scores:
+        description += f", SSIM {scores[len(data)]:.4f}"
+    return data, description
+
+
+def remove_stale_variants(filepath):
+    """
+    Delete copies of an output saved earlier in another format, so a
+    folder never holds both slide.png and slide.webp
+
+    Args:
+        filepath: Path of the current output file
+    """
+    stem, extension = os.path.splitext(filepath)
+    for other in IMAGE_EXTENSIONS:
+        if other != extension and os.path.exists(stem + other):
+            try:
+                os.remove(stem + other)
+            except OSError as e:
+                print(f"  Error removing old output {stem + other}: {e}")
+
+
+def save_output(image, filepath, fmt=None):
+    """
+    Encode an image and write it atomically, logging size and encode time
+
+    Written to a new file, so an output hardlinked from the render store
+    is never overwritten in place.
+
+    Args:
+        image: PIL Image
+        filepath: Output path
+        fmt: Format name (from the path's extension if None)
+
+    Returns:
+        Number of bytes written
+    """
+    if fmt is None:
+        fmt = format_for_path(filepath)
+    filename = os.path.basename(filepath)
+
+    start = time.perf_counter()
+    with span('save', filename, format=fmt):
+        if config.FEATURES['auto_optimize_images']:
+            data, description = encode_optimized(image, fmt)
+        else:
+            data, description = encode_image(image, fmt), None
+        atomic_write(filepath, data)
+    elapsed = time.perf_counter() - start
+
+    remove_stale_variants(filepath)
+    count('save.bytes', len(data))
+    detail = f" ({description})" if description else ""
+    print(f"  Encoded {filename}: {len(data) / 1024:.0f} KB {fmt.upper()}{detail} in {elapsed:.2f}s")
+    return len(data)
+
+
+class OutputEncoder:
+    """
+    Encodes and writes images on a thread pool while the caller goes on
+    composing the next page
+
+    Pillow releases the GIL while compressing, so encodes run in parallel
+    with composition. At most two images per thread wait in the queue,
+    which bounds the memory held by finished pages.
+    """
+
+    def __init__(self, workers=None):
+        if workers is None:
+            workers = config.ENCODING['workers']
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='encode')
+        self._slots = threading.BoundedSemaphore(workers * 2)
+        self._futures = {}
+
+    def _run(self, image, filepath, fmt):
+        try:
+            return save_output(image, filepath, fmt)
+        finally:
+            self._slots.release()
+
+    def submit(self, image, filepath, fmt=None):
+        """
+        Queue an image for encoding, blocking while the queue is full
+
+        Args:
+            image: PIL Image (not modified afterwards by the caller)
+            filepath: Output path
+            fmt: Format name (from the path's extension if None)
+        """
+        self._slots.acquire()
+        self._futures[filepath] = self._executor.submit(self._run, image, filepath, fmt)
+
+    def wait(self):
+        """
+        Wait for every queued image
+
+        Returns:
+            Dict of filepath -> error string, for files that failed to encode
+        """
+        errors = {}
+        for filepath, future in self._futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                errors[filepath] = f"Error encoding {filepath}: {e}"
+        self._futures = {}
+        return errors
+
+    def close(self):
+        """Wait for queued images and stop the threads"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
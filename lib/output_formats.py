@@ -0,0 +1,106 @@
+"""
+Output formats
+Which still image format each asset type is saved in and the filenames
+that follow from it. Needs only the config, so the uploader can find the
+day's pages without loading the image stack
+"""
+
+import os
+from config import creative_config as config
+
+
+# Format name: (Pillow format, file extension)
+IMAGE_FORMATS = {
+    'png': ('PNG', '.png'),
+    'webp': ('WEBP', '.webp'),
+    'avif': ('AVIF', '.avif'),
+    'jpeg': ('JPEG', '.jpg'),
+}
+
+FORMAT_ALIASES = {'jpg': 'jpeg'}
+
+# Every extension a still output page can have
+IMAGE_EXTENSIONS = tuple(extension for _, extension in IMAGE_FORMATS.values())
+
+_warned = set()
+
+
+def format_available(fmt):
+    """
+    Check whether this Pillow build can encode a format
+
+    Args:
+        fmt: Format name from IMAGE_FORMATS
+
+    Returns:
+        True if supported
+    """
+    if fmt == 'png':
+        return True
+    from PIL import features
+    if fmt == 'jpeg':
+        return features.check('jpg')
+    return features.check(fmt)
+
+
+def output_format(asset_type):
+    """
+    Encoding format configured for an asset type, falling back to PNG
+    when the format is unknown or not supported by the installed Pillow
+
+    Args:
+        asset_type: Key in OUTPUT['formats'], e.g. 'individual', 'cover', 'end'
+
+    Returns:
+        Format name from IMAGE_FORMATS
+    """
+    fmt = str(config.OUTPUT['formats'].get(asset_type, 'png')).lower()
+    fmt = FORMAT_ALIASES.get(fmt, fmt)
+    if fmt in IMAGE_FORMATS and format_available(fmt):
+        return fmt
+
+    if (asset_type, fmt) not in _warned:
+        _warned.add((asset_type, fmt))
+        print(f"  Warning: cannot encode {asset_type} images as {fmt}, saving PNG instead")
+    return 'png'
+
+
+def output_filename(stem, asset_type):
+    """
+    Output filename for an asset in its configured format
+
+    Args:
+        stem: Filename without extension, e.g. 'cover_page'
+        asset_type: Key in OUTPUT['formats']
+
+    Returns:
+        Filename string
+    """
+    return stem + IMAGE_FORMATS[output_format(asset_type)][1]
+
+
+def format_for_path(path):
+    """
+    Format name for an output path, from its extension
+
+    Args:
+        path: File path
+
+    Returns:
+        Format name from IMAGE_FORMATS
+    """
+    extension = os.path.splitext(path)[1].lower()
+    for fmt, (_, fmt_extension) in IMAGE_FORMATS.items():
+        if extension == fmt_extension:
+            return fmt
+    return FORMAT_ALIASES.get(extension.lstrip('.'), 'png')
+
+
+def encoder_settings():
+    """
+    Encoder options for every format, used in build fingerprints
+
+    Returns:
+        Dict of ENCODING options without the thread count
+    """
+    return {fmt: config.ENCODING.get(fmt, {}) for fmt in IMAGE_FORMATS}
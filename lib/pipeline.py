@@ -0,0 +1,218 @@
+"""
+Single-pass daily pipeline
+Fetches the deal list once and shares downloaded and processed product
+images between all generators
+"""
+
+from PIL import Image
+from config import creative_config as config
+from .deals import load_deals
+from .downloader import get_downloader
+from .replay import get_replay
+from .background_removal import limit_source_size
+from .image_utils import download_image_bytes, decode_image, remove_background, remove_backgrounds
+
+
+class ProductAssets:
+    """
+    Asset set for one product image source: the downloaded bytes,
+    the decoded image and the background-removed cutout
+    """
+
+    def __init__(self, source, data=None, image=None, needs_cutout=True):
+        self.source = source
+        self.data = data
+        self.image = image
+        self.needs_cutout = needs_cutout
+        self._cutout = None
+
+    @property
+    def cutout(self):
+        """Background-removed image, computed on first access"""
+        if self._cutout is None and self.image is not None:
+            if self.needs_cutout:
+                print("  Removing background...")
+                self._cutout = remove_background(self.image, source_bytes=self.data)
+            else:
+                self._cutout = limit_source_size(self.image, config.BACKGROUND_REMOVAL['max_source_edge'])
+        return self._cutout
+
+
+class DailyPipeline:
+    """
+    Holds the day's deals and a per-source asset set, so every renderer
+    (individual, cover, animated cover, end page) reuses the same
+    downloads and cutouts instead of redoing them
+    """
+
+    def __init__(self, deals=None, api_url=None, refresh_deals=False):
+        if deals is None:
+            deals = load_deals(api_url, refresh=refresh_deals)
+        self.deals = deals
+        self._assets = {}
+
+    def _load_url(self, url):
+        """Download and decode an image URL once"""
+        key = ('url', url)
+        if key not in self._assets:
+            self._store_url(url, download_image_bytes(url))
+        return self._assets[key]
+
+    def _source_edge(self):
+        """Longest source edge worth decoding (None keeps full resolution)"""
+        settings = config.BACKGROUND_REMOVAL
+        if settings['restore_full_resolution']:
+            return None
+        return settings['max_source_edge'] or None
+
+    def _store_url(self, url, data):
+        image = decode_image(data, self._source_edge()) if data is not None else None
+        self._assets[('url', url)] = ProductAssets(url, data, image) if image is not None else None
+
+    def _load_path(self, path, needs_cutout=True):
+        """Load a local image file once"""
+        key = ('path', path, needs_cutout)
+        if key not in self._assets:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                image = Image.open(path)
+                image.load()
+                self._assets[key] = ProductAssets(path, data, image, needs_cutout)
+            except Exception as e:
+                print(f"  Error loading local image {path}: {e}")
+                self._assets[key] = None
+        return self._assets[key]
+
+    def product_assets(self, deal):
+        """
+        Get the asset set for a deal's primary image
+
+        Args:
+            deal: Deal record
+
+        Returns:
+            ProductAssets or None if the deal has no usable image
+        """
+        if not deal.image_urls:
+            return None
+        return self._load_url(deal.image_urls[0])
+
+    def collage_assets(self, deal):
+        """
+        Get the asset set used for a deal on the collage pages,
+        honouring PRODUCT_IMAGE_OVERRIDES
+
+        Args:
+            deal: Deal record
+
+        Returns:
+            ProductAssets or None if the deal has no usable image
+        """
+        if not deal.image_urls:
+            return None
+
+        override = config.PRODUCT_IMAGE_OVERRIDES.get(deal.brand)
+        if override:
+            if 'url' in override:
+                return self._load_url(override['url'])
+            if 'path' in override:
+                assets = self._load_path(override['path'], override.get('remove_background', True))
+                if assets is not None:
+                    return assets
+
+        return self.product_assets(deal)
+
+    def collage_images(self, limit, use_overrides=True):
+        """
+        Get cutouts for the first `limit` deals
+
+        Args:
+            limit: Maximum number of deals to use
+            use_overrides: Apply PRODUCT_IMAGE_OVERRIDES
+
+        Returns:
+            List of PIL Images
+        """
+        product_images = []
+        selected = self.deals[:limit]
+        for i, deal in enumerate(selected):
+            if use_overrides:
+                assets = self.collage_assets(deal)
+            else:
+                assets = self.product_assets(deal)
+            if assets is not None and assets.cutout is not None:
+                product_images.append(assets.cutout)
+                print(f"    Processed product {i+1}/{len(selected)}")
+        return product_images
+
+    def image_urls(self, collage_limit=7):
+        """
+        List every remote image URL the renderers will need
+
+        Args:
+            collage_limit: Number of deals shown on the collage pages
+
+        Returns:
+            List of URLs in deal order
+        """
+        urls = []
+        for i, deal in enumerate(self.deals):
+            if not deal.image_urls:
+                continue
+            urls.append(deal.image_urls[0])
+            override = config.PRODUCT_IMAGE_OVERRIDES.get(deal.brand)
+            if i < collage_limit and override and 'url' in override:
+                urls.append(override['url'])
+        return urls
+
+    def download_all(self, collage_limit=7):
+        """
+        Download every needed image in parallel
+
+        Args:
+            collage_limit: Number of deals shown on the collage pages
+        """
+        urls = [url for url in self.image_urls(collage_limit) if ('url', url) not in self._assets]
+        if not urls:
+            return
+
+        downloader = get_downloader()
+        print(f"  Downloading {len(set(urls))} product images...")
+        for url, data in downloader.fetch_all(urls).items():
+            self._store_url(url, data)
+        source = "from replay bundle" if get_replay() is not None else f"({downloader.cache_hits} served from cache)"
+        print(f"  Downloaded {downloader.bytes_downloaded / 1024:.0f} KB {source}")
+
+    def prepare(self, collage_limit=7, product_deals=None):
+        """
+        Eagerly download and cut out every image the renderers will need
+
+        Args:
+            collage_limit: Number of deals shown on the collage pages
+            product_deals: Deals whose slides will be rendered (all if None),
+                so slides kept from an earlier build skip background removal
+        """
+        print("Preparing product assets...")
+        self.download_all(collage_limit)
+
+        pending = []
+        for i, deal in enumerate(self.deals):
+            sources = []
+            if product_deals is None or deal in product_deals:
+                sources.append(self.product_assets(deal))
+            if i < collage_limit:
+                sources.append(self.collage_assets(deal))
+            for assets in sources:
+                if assets is not None and assets.needs_cutout and assets._cutout is None \
+                        and assets not in pending:
+                    pending.append(assets)
+
+        # Cut out the whole day's images in one batched pass
+        if pending:
+            cutouts = remove_backgrounds([a.image for a in pending], [a.data for a in pending])
+            for assets, cutout in zip(pending, cutouts):
+                assets._cutout = cutout
+
+        loaded = sum(1 for assets in self._assets.values() if assets is not None)
+        print(f"  Prepared {loaded} unique product images")
@@ -0,0 +1,148 @@
+"""
+Profiling hook for the generator entry points
+Runs a main function under cProfile and tracemalloc and saves the stats
+plus a readable top-N summary to .cache/profiles/<day>
+"""
+
+import argparse
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from datetime import datetime
+from config import creative_config as config
+
+
+# Set to 1 to profile any generator without passing --profile
+PROFILE_ENV = 'GENERATOR_PROFILE'
+
+
+def profiling_requested(flag=False):
+    """
+    Check the --profile flag and the GENERATOR_PROFILE environment variable
+
+    Args:
+        flag: Value of a --profile command line flag
+
+    Returns:
+        True if the run should be profiled
+    """
+    return bool(flag) or os.environ.get(PROFILE_ENV, '') not in ('', '0')
+
+
+def profile_paths(label, day=None):
+    """
+    Paths for a profile's stats and summary, under the gitignored cache
+    directory so the daily commit of generated_images/ doesn't pick them up
+
+    Args:
+        label: Entry point name, e.g. 'generate_cover_page'
+        day: Date string in OUTPUT['date_format'] (today if None)
+
+    Returns:
+        Tuple (stats path, summary path)
+    """
+    now = datetime.now()
+    if day is None:
+        day = now.strftime(config.OUTPUT['date_format'])
+    base = os.path.join(config.CACHE['base_dir'], config.PROFILING['dir'], day,
+                        f"{label}-{now.strftime('%H%M%S')}")
+    return f"{base}.prof", f"{base}.txt"
+
+
+def format_summary(label, profiler, snapshot, peak, wall, top):
+    """
+    Build the text summary of a profiled run
+
+    Args:
+        label: Entry point name
+        profiler: Finished cProfile.Profile
+        snapshot: tracemalloc snapshot taken at the end of the run
+        peak: Peak traced memory in bytes
+        wall: Wall time in seconds
+        top: Number of rows per table
+
+    Returns:
+        Summary string
+    """
+    out = io.StringIO()
+    out.write(f"Profile of {label}\n")
+    out.write(f"Wall time: {wall:.2f}s\n")
+    out.write(f"Peak traced memory: {peak / (1024 * 1024):.1f} MB\n")
+    out.write("Traced memory covers Python and numpy allocations, not Pillow's pixel buffers.\n")
+    out.write("Slide render worker processes are not included.\n")
+
+    for sort_key in ('cumulative', 'tottime'):
+        out.write(f"\n=== Top {top} functions by {sort_key} time ===\n")
+        stats = pstats.Stats(profiler, stream=out)
+        stats.strip_dirs().sort_stats(sort_key).print_stats(top)
+
+    out.write(f"\n=== Top {top} allocation sites still held at exit ===\n")
+    for stat in snapshot.statistics('lineno')[:top]:
+        out.write(f"{stat.size / 1024:10.1f} KB {stat.count:8d} blocks  {stat.traceback}\n")
+
+    return out.getvalue()
+
+
+def run_profiled(func, label, *args, top=None, **kwargs):
+    """
+    Call a function under cProfile and tracemalloc and save the results
+
+    Args:
+        func: Function to profile, e.g. a generator's main
+        label: Name used for the output files
+        *args, **kwargs: Passed to func
+        top: Rows per summary table (PROFILING['top'] if None)
+
+    Returns:
+        Whatever func returns
+    """
+    if top is None:
+        top = config.PROFILING['top']
+
+    profiler = cProfile.Profile()
+    tracemalloc.start(config.PROFILING['tracemalloc_frames'])
+    start = time.perf_counter()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        wall = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stats_path, summary_path = profile_paths(label)
+        try:
+            os.makedirs(os.path.dirname(stats_path), exist_ok=True)
+            profiler.dump_stats(stats_path)
+            with open(summary_path, 'w') as f:
+                f.write(format_summary(label, profiler, snapshot, peak, wall, top))
+            print(f"Profile: {summary_path} (stats: {stats_path}, "
+                  f"peak traced memory {peak / (1024 * 1024):.1f} MB)")
+        except OSError as e:
+            print(f"Error writing profile: {e}")
+
+
+def run_main(main, label, argv=None):
+    """
+    Entry point for a generator script: runs main, profiled when
+    --profile is passed or GENERATOR_PROFILE is set
+
+    Args:
+        main: The script's main function
+        label: Name used for the output files
+        argv: Command line arguments (sys.argv if None)
+
+    Returns:
+        Whatever main returns
+    """
+    parser = argparse.ArgumentParser(description=(main.__doc__ or label).strip())
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile the run with cProfile and tracemalloc")
+    args = parser.parse_args(argv)
+
+    if profiling_requested(args.profile):
+        return run_profiled(main, label)
+    return main()
@@ -0,0 +1,123 @@
+"""
+Persistent store of rendered slides keyed by input fingerprint
+Lets a deal that repeats with identical inputs on a later day reuse the
+earlier render instead of rendering it again
+"""
+
+import os
+import shutil
+import uuid
+from config import creative_config as config
+from .cache_utils import touch, evict_lru
+from .instrumentation import count
+
+
+class RenderStore:
+    """
+    On-disk store of finished output files named by their build
+    fingerprint, placed into day folders by hardlink (or copy)
+    """
+
+    def __init__(self, store_dir=None, max_size_mb=None, use_hardlinks=None):
+        settings = config.CACHE['renders']
+        if store_dir is None:
+            store_dir = os.path.join(config.CACHE['base_dir'], settings['dir'])
+        if max_size_mb is None:
+            max_size_mb = settings['max_size_mb']
+        if use_hardlinks is None:
+            use_hardlinks = settings['hardlink']
+
+        self.store_dir = store_dir
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.use_hardlinks = use_hardlinks
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    def _path(self, fingerprint, extension):
+        return os.path.join(self.store_dir, f"{fingerprint}{extension}")
+
+    def _place(self, src, dest):
+        """Hardlink or copy src to dest, replacing dest atomically"""
+        tmp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+        try:
+            linked = False
+            if self.use_hardlinks:
+                try:
+                    os.link(src, tmp_path)
+                    linked = True
+                except OSError:
+                    # Different filesystem or no hardlink support
+                    pass
+            if not linked:
+                shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, dest)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def fetch(self, fingerprint, dest):
+        """
+        Place a stored render at dest
+
+        Args:
+            fingerprint: Build fingerprint of the output's inputs
+            dest: Output file path (its extension selects the entry)
+
+        Returns:
+            True if a stored render was placed, False on miss
+        """
+        path = self._path(fingerprint, os.path.splitext(dest)[1])
+        if not os.path.exists(path):
+            self.misses += 1
+            return False
+
+        try:
+            self._place(path, dest)
+        except OSError as e:
+            print(f"  Error reusing stored render: {e}")
+            self.misses += 1
+            return False
+
+        # Touch the entry so eviction sees it as recently used
+        touch(path)
+        self.hits += 1
+        count('render_store.hits')
+        return True
+
+    def put(self, fingerprint, path):
+        """
+        Store a freshly rendered output and evict old entries if over the size cap
+
+        Args:
+            fingerprint: Build fingerprint of the output's inputs
+            path: Rendered file
+        """
+        try:
+            self._place(path, self._path(fingerprint, os.path.splitext(path)[1]))
+        except OSError as e:
+            print(f"  Error storing render: {e}")
+            return
+
+        evict_lru(self.store_dir, self.max_bytes)
+
+
+_render_store = None
+
+
+def get_render_store():
+    """
+    Get the shared render store
+
+    Returns:
+        RenderStore or None if disabled in config
+    """
+    global _render_store
+    if not config.CACHE['renders']['enabled']:
+        return None
+    if _render_store is None:
+        _render_store = RenderStore()
+    return _render_store
@@ -0,0 +1,265 @@
+"""
+Record and replay fixture bundles
+A bundle holds one deals response plus every image downloaded for it,
+so a run can be repeated without the network
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import creative_config as config
+from .cache_utils import atomic_write
+
+
+MANIFEST_FILENAME = 'manifest.json'
+DEALS_FILENAME = 'deals.json'
+IMAGES_DIR = 'images'
+# Replayed runs write their day folders here inside the bundle, never into
+# the live OUTPUT['base_dir']
+OUTPUT_DIR = 'out'
+
+
+class BundleRecorder:
+    """
+    Collects the deals response and downloaded images of a live run
+    into a bundle directory
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.images = {}
+        self.api_url = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(self.path, IMAGES_DIR), exist_ok=True)
+
+    def record_deals(self, body, api_url=None):
+        """
+        Store the raw deals response
+
+        Args:
+            body: Response body bytes
+            api_url: URL it was fetched from
+        """
+        atomic_write(os.path.join(self.path, DEALS_FILENAME), body)
+        self.api_url = api_url
+
+    def record_image(self, url, body):
+        """
+        Store a downloaded image
+
+        Args:
+            url: Image URL
+            body: Response body bytes
+        """
+        name = f"{IMAGES_DIR}/{hashlib.sha256(url.encode('utf-8')).hexdigest()}"
+        with self._lock:
+            if url in self.images:
+                return
+            self.images[url] = name
+        atomic_write(os.path.join(self.path, name), body)
+
+    def save(self):
+        """Write the manifest"""
+        manifest = {
+            'version': 1,
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'api_url': self.api_url,
+            'deals': DEALS_FILENAME,
+            'images': dict(sorted(self.images.items())),
+        }
+        atomic_write(os.path.join(self.path, MANIFEST_FILENAME),
+                     json.dumps(manifest, indent=2).encode('utf-8'))
+        print(f"Recorded {len(self.images)} images to {self.path}")
+
+
+class ReplayBundle:
+    """
+    Serves a recorded bundle, either read directly from disk or over a
+    local HTTP stand-in for the API and image CDNs
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILENAME), 'r') as f:
+            self.manifest = json.load(f)
+        self.images = self.manifest.get('images', {})
+        self._files = set(self.images.values())
+        self._server = None
+        self._thread = None
+
+    @property
+    def serving(self):
+        return self._server is not None
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.path, name), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def deals_body(self):
+        """
+        Recorded deals response
+
+        Returns:
+            Response body bytes or None if missing
+        """
+        return self._read(self.manifest.get('deals', DEALS_FILENAME))
+
+    def image(self, url):
+        """
+        Recorded image for a URL
+
+        Args:
+            url: Original image URL
+
+        Returns:
+            Bytes or None if the URL was not recorded
+        """
+        name = self.images.get(url)
+        return self._read(name) if name else None
+
+    def api_url(self):
+        """URL of the deals response on the local server"""
+        return f"{self._base_url()}/api/deals"
+
+    def url_for(self, url):
+        """
+        Map an original image URL to the local server
+
+        Args:
+            url: Original image URL
+
+        Returns:
+            Local URL (answers 404 if the URL was not recorded)
+        """
+        name = self.images.get(url, 'missing')
+        return f"{self._base_url()}/{name}"
+
+    def _base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve(self):
+        """Start the local HTTP stand-in on a free port"""
+        bundle = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/api/deals':
+                    body = bundle.deals_body()
+                    content_type = 'application/json'
+                else:
+                    name = self.path.lstrip('/')
+                    body = bundle._read(name) if name in bundle._files else None
+                    content_type = 'application/octet-stream'
+
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name='replay-server', daemon=True)
+        self._thread.start()
+        print(f"Serving replay bundle {self.path} at {self._base_url()}")
+
+    def close(self):
+        """Stop the local server if running"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+
+_recorder = None
+_replay = None
+_live_output_dir = None
+
+
+def start_recording(path):
+    """
+    Record this run's deals and images into a bundle
+
+    Args:
+        path: Bundle directory
+
+    Returns:
+        BundleRecorder
+    """
+    global _recorder
+    _recorder = BundleRecorder(path)
+    return _recorder
+
+
+def start_replay(path, serve=False):
+    """
+    Replay a recorded bundle instead of using the network
+
+    Outputs, the deals snapshot and build state go to <bundle>/out until
+    stop(), so a replay never touches the live day folder.
+
+    Args:
+        path: Bundle directory
+        serve: Serve the bundle over a local HTTP server instead of
+               reading it directly
+
+    Returns:
+        ReplayBundle
+    """
+    global _replay, _live_output_dir
+    _replay = ReplayBundle(path)
+    if _live_output_dir is None:
+        _live_output_dir = config.OUTPUT['base_dir']
+    config.OUTPUT['base_dir'] = os.path.join(path, OUTPUT_DIR)
+    if serve:
+        _replay.serve()
+    print(f"Replaying {len(_replay.images)} recorded images from {path} "
+          f"(output in {config.OUTPUT['base_dir']})")
+    return _replay
+
+
+def stop():
+    """Save any recording and stop any replay server"""
+    global _recorder, _replay, _live_output_dir
+    if _recorder is not None:
+        _recorder.save()
+        _recorder = None
+    if _replay is not None:
+        _replay.close()
+        _replay = None
+    if _live_output_dir is not None:
+        config.OUTPUT['base_dir'] = _live_output_dir
+        _live_output_dir = None
+
+
+def get_recorder():
+    """
+    Get the active recorder
+
+    Returns:
+        BundleRecorder or None
+    """
+    return _recorder
+
+
+def get_replay():
+    """
+    Get the active replay bundle
+
+    Returns:
+        ReplayBundle or None
+    """
+    return _replay
@@ -2,14 +2,23 @@
 Reusable text rendering utilities
 """
 
-from PIL import ImageFont, ImageDraw
+from collections import namedtuple
 from config import creative_config as config
-import os
+from .font_registry import get_font_registry
+
+
+# Measured single-line text. bbox is relative to the draw origin (the
+# top-left anchor used by ImageDraw.text), advance is the pen advance
+TextLayout = namedtuple('TextLayout', [
+    'text', 'font', 'bbox', 'ascent', 'descent', 'advance', 'width', 'height',
+])
+
+_layout_cache = {}
 
 
 def get_font(font_type='brand'):
     """
-    Get font from configuration
+    Get font from configuration (resolved and loaded once per run)
 
     Args:
         font_type: 'brand', 'discount', or 'title'
@@ -17,17 +26,89 @@ def get_font(font_type='brand'):
     Returns:
         ImageFont or None
     """
-    font_config = config.FONTS.get(font_type, config.FONTS['brand'])
+    return get_font_registry().get(font_type)
 
-    for path in font_config['paths']:
-        if os.path.exists(path):
-            try:
-                return ImageFont.truetype(path, font_config['size'])
-            except:
-                continue
 
-    print(f"Warning: Font {font_type} not found, using default")
-    return ImageFont.load_default()
+def measure_text(text, font_path, size):
+    """
+    Measure text once per (text, font, size) and cache the layout
+
+    Args:
+        text: Text string (single line)
+        font_path: Font file path, or None for Pillow's default font
+        size: Font size in pixels
+
+    Returns:
+        TextLayout
+    """
+    key = (text, font_path, size)
+    layout = _layout_cache.get(key)
+    if layout is None:
+        font = get_font_registry().load(font_path, size)
+        bbox = font.getbbox(text)
+        ascent, descent = font.getmetrics()
+        layout = TextLayout(
+            text=text,
+            font=font,
+            bbox=bbox,
+            ascent=ascent,
+            descent=descent,
+            advance=font.getlength(text),
+            width=bbox[2] - bbox[0],
+            height=bbox[3] - bbox[1],
+        )
+        _layout_cache[key] = layout
+    return layout
+
+
+def layout_text(text, font_type='brand', size=None):
+    """
+    Measure text in a FONTS config font
+
+    Args:
+        text: Text string (single line)
+        font_type: 'brand', 'discount', or 'title'
+        size: Optional size override (config size if None)
+
+    Returns:
+        TextLayout
+    """
+    if size is None:
+        size = config.FONTS.get(font_type, config.FONTS['brand'])['size']
+    return measure_text(text, get_font_registry().resolve_type(font_type), size)
+
+
+def draw_text_layout(draw, layout, position, fill, align='left',
+                     shadow_offset=0, shadow_fill=None):
+    """
+    Draw a measured text layout without measuring it again
+
+    Args:
+        draw: ImageDraw object
+        layout: TextLayout from measure_text() / layout_text()
+        position: Tuple (x, y); x is the left edge, centre or right edge
+                  depending on align
+        fill: Text color
+        align: 'left', 'center' or 'right'
+        shadow_offset: Shadow offset in pixels (0 for no shadow)
+        shadow_fill: Shadow color (no shadow if None)
+
+    Returns:
+        Text bounding box
+    """
+    x, y = position
+    if align == 'center':
+        x = x - layout.width // 2
+    elif align == 'right':
+        x = x - layout.width
+
+    if shadow_offset and shadow_fill is not None:
+        draw.text((x + shadow_offset, y + shadow_offset), layout.text,
+                  font=layout.font, fill=shadow_fill)
+    draw.text((x, y), layout.text, font=layout.font, fill=fill)
+
+    left, top, right, bottom = layout.bbox
+    return x + left, y + top, x + right, y + bottom
 
 
 def add_text_with_shadow(draw, text, position, font_type='brand',
@@ -50,27 +131,17 @@ def add_text_with_shadow(draw, text, position, font_type='brand',
         color_scheme = config.ACTIVE_COLOR_SCHEME
 
     scheme = config.COLOR_SCHEMES[color_scheme]
-    font = get_font(font_type)
+    layout = layout_text(text, font_type)
 
     if shadow_offset is None:
         shadow_offset = 5
 
-    x, y = position
-
-    # Draw shadow if enabled
-    if config.FEATURES['text_shadows']:
-        draw.text(
-            (x + shadow_offset, y + shadow_offset),
-            text,
-            font=font,
-            fill=scheme['text_shadow']
-        )
-
-    # Draw main text
-    draw.text((x, y), text, font=font, fill=scheme['text_primary'])
+    # Shadows can be switched off globally
+    if not config.FEATURES['text_shadows']:
+        shadow_offset = 0
 
-    # Return bounding box
-    return draw.textbbox((x, y), text, font=font)
+    return draw_text_layout(draw, layout, position, scheme['text_primary'],
+                            shadow_offset=shadow_offset, shadow_fill=scheme['text_shadow'])
 
 
 def get_text_dimensions(text, font_type='brand'):
@@ -84,18 +155,8 @@ def get_text_dimensions(text, font_type='brand'):
     Returns:
         Tuple (width, height)
     """
-    from PIL import Image
-    font = get_font(font_type)
-
-    # Create temporary image to measure text
-    temp_img = Image.new('RGB', (1, 1))
-    draw = ImageDraw.Draw(temp_img)
-    bbox = draw.textbbox((0, 0), text, font=font)
-
-    width = bbox[2] - bbox[0]
-    height = bbox[3] - bbox[1]
-
-    return width, height
+    layout = layout_text(text, font_type)
+    return layout.width, layout.height
 
 
 def transform_text(text, transform='lowercase'):
@@ -157,11 +218,11 @@ def add_multiline_text(draw, lines, start_y, canvas_width,
     current_y = start_y
 
     for i, line in enumerate(lines):
-        x = calculate_centered_position(line, canvas_width, font_type)
+        layout = layout_text(line, font_type)
+        x = (canvas_width - layout.width) // 2
         add_text_with_shadow(draw, line, (x, current_y), font_type, color_scheme)
 
         if i < len(lines) - 1:
-            _, height = get_text_dimensions(line, font_type)
-            current_y += height + line_spacing
+            current_y += layout.height + line_spacing
 
     return current_y
@@ -0,0 +1,147 @@
+"""
+Streaming video writer
+Pipes raw RGB frames to ffmpeg (or PyAV when ffmpeg is not installed)
+so only one frame is held in memory at a time
+"""
+
+import shutil
+import subprocess
+import time
+from fractions import Fraction
+import numpy as np
+from config import creative_config as config
+
+
+VIDEO_FORMATS = ('mp4', 'webm')
+
+
+def _find_ffmpeg():
+    return shutil.which(config.VIDEO.get('ffmpeg_path', 'ffmpeg'))
+
+
+def _pyav_available():
+    try:
+        import av  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def video_encoder_available():
+    """
+    Check whether any video backend is installed
+
+    Returns:
+        'ffmpeg', 'pyav' or None
+    """
+    if _find_ffmpeg():
+        return 'ffmpeg'
+    if _pyav_available():
+        return 'pyav'
+    return None
+
+
+class VideoWriter:
+    """
+    Encodes frames to H.264 MP4 or VP9 WebM as they are produced
+
+    Codec and quality come from VIDEO[<format>] in config. Frames are
+    written as raw rgb24 and converted to yuv420p by the encoder.
+    """
+
+    def __init__(self, path, size, duration=100, video_format='mp4', backend=None):
+        if video_format not in VIDEO_FORMATS:
+            raise ValueError(f"Unsupported video format: {video_format}")
+
+        self.path = path
+        self.width, self.height = size
+        self.fps = Fraction(1000, duration)
+        self.video_format = video_format
+        self.settings = config.VIDEO[video_format]
+        self.backend = backend or video_encoder_available()
+        if self.backend is None:
+            raise RuntimeError("No video encoder found (install ffmpeg or PyAV)")
+
+        self.frames_written = 0
+        self.encode_seconds = 0.0
+        self._process = None
+        self._container = None
+        self._stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _ffmpeg_command(self):
+        codec = self.settings['codec']
+        command = [
+            _find_ffmpeg(), '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+            '-s', f"{self.width}x{self.height}",
+            '-r', f"{self.fps.numerator}/{self.fps.denominator}",
+            '-i', '-',
+            '-c:v', codec, '-pix_fmt', 'yuv420p',
+            '-crf', str(self.settings['crf']),
+        ]
+        if codec == 'libx264':
+            command += ['-preset', self.settings.get('preset', 'medium'), '-movflags', '+faststart']
+        elif codec == 'libvpx-vp9':
+            # Constant quality mode needs an explicit zero bitrate
+            command += ['-b:v', '0', '-row-mt', '1']
+        return command + [self.path]
+
+    def _open(self):
+        if self.backend == 'ffmpeg':
+            self._process = subprocess.Popen(self._ffmpeg_command(), stdin=subprocess.PIPE,
+                                             stderr=subprocess.PIPE)
+        else:
+            import av
+            self._container = av.open(self.path, mode='w')
+            self._stream = self._container.add_stream(self.settings['codec'], rate=self.fps)
+            self._stream.width = self.width
+            self._stream.height = self.height
+            self._stream.pix_fmt = 'yuv420p'
+            self._stream.options = {'crf': str(self.settings['crf'])}
+
+    def add_frame(self, frame, dirty_rects=None):
+        """
+        Encode one frame
+
+        Args:
+            frame: RGB PIL Image at the output size
+            dirty_rects: Ignored; accepted for compatibility with GifWriter
+        """
+        start = time.perf_counter()
+        if self._process is None and self._container is None:
+            self._open()
+
+        frame = frame.convert('RGB')
+        if self._process is not None:
+            self._process.stdin.write(frame.tobytes())
+        else:
+            import av
+            video_frame = av.VideoFrame.from_ndarray(np.asarray(frame), format='rgb24')
+            for packet in self._stream.encode(video_frame):
+                self._container.mux(packet)
+
+        self.frames_written += 1
+        self.encode_seconds += time.perf_counter() - start
+
+    def close(self):
+        """Flush the encoder and finish the file"""
+        start = time.perf_counter()
+        if self._process is not None:
+            self._process.stdin.close()
+            stderr = self._process.stderr.read()
+            returncode = self._process.wait()
+            self._process = None
+            if returncode != 0:
+                raise RuntimeError(f"ffmpeg exited with {returncode}: {stderr.decode(errors='replace').strip()}")
+        elif self._container is not None:
+            for packet in self._stream.encode():
+                self._container.mux(packet)
+            self._container.close()
+            self._container = None
+        self.encode_seconds += time.perf_counter() - start
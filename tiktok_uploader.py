@@ -10,6 +10,7 @@ import requests
 from urllib.parse import urlencode
 import webbrowser
 from datetime import datetime
+from lib.output_formats import IMAGE_EXTENSIONS, output_filename
 
 # TikTok API credentials (Production)
 CLIENT_KEY = "aw1n1yw1i6thayv0"
@@ -290,14 +291,16 @@ def main():
                 return
 
             # Get carousel images in order: cover, products, end
-            cover_page = os.path.join(image_folder, 'cover_page.png')
-            end_page = os.path.join(image_folder, 'end_page.png')
+            # (in whichever formats OUTPUT['formats'] saves them)
+            cover_page = os.path.join(image_folder, output_filename('cover_page', 'cover'))
+            end_page = os.path.join(image_folder, output_filename('end_page', 'end'))
+            page_names = [os.path.basename(cover_page), os.path.basename(end_page)]
 
             # Get product images (exclude cover and end)
             product_images = sorted([
                 os.path.join(image_folder, f)
                 for f in os.listdir(image_folder)
-                if f.endswith('.png') and f not in ['cover_page.png', 'end_page.png']
+                if f.endswith(IMAGE_EXTENSIONS) and f not in page_names
             ])
 
             # Build carousel: cover + products + end